@@ -0,0 +1,157 @@
+"""Write-if-changed emission of build artifacts, on a thread pool.
+
+The mkdocs hook writes one resolved-markdown file per page plus llms.txt on
+every build. Rewriting files whose content hasn't changed bumps their mtimes,
+which defeats rsync/CDN diffing, and ~250 small writes in a row add up. An
+ArtifactWriter hands each write to a pool thread. The thread compares the
+new bytes with the file already there (size first, then content) and leaves
+an identical file untouched. Other writes go to `<path>.tmp` and are renamed
+into place. Writers that stream to their own `<path>.tmp` (the feed sinks and
+their sidecars) finish with replace_if_changed() instead.
+
+Skipping only helps where the previous build's files are still there. The
+standalone generator's outputs persist, but a plain `mkdocs build` (or `mkdocs
+serve` rebuild) empties site_dir first. So the hook writes into a persistent
+stage directory and publish() hardlinks the results into site_dir: an unchanged
+artifact keeps its inode and mtime from build to build. Nothing may edit the
+published files in place; every writer here replaces them by rename.
+
+  with ArtifactWriter() as out:
+      out.write(".cache/ai_site/build/apps/build.md", text)
+  print(out.written, out.skipped)
+  publish(".cache/ai_site/build", "site", out.paths)
+
+  GEN_ARTIFACT_THREADS=8   pool size (1 writes inline, in order)
+"""
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_THREADS = 8
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def write_if_changed(path, data):
+    """Write `data` (str: UTF-8) to `path` unless it already holds exactly that.
+    Returns True if the file was written."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass  # missing (or unreadable): write it
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return True
+
+
+def _same_bytes(a, b, block=1 << 20):
+    try:
+        if os.path.getsize(a) != os.path.getsize(b):
+            return False
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            while True:
+                x, y = fa.read(block), fb.read(block)
+                if x != y:
+                    return False
+                if not x:
+                    return True
+    except OSError:
+        return False
+
+
+def replace_if_changed(tmp, path):
+    """Rename the finished `tmp` over `path`, unless `path` already holds the same
+    bytes: then drop `tmp` and leave `path` (and its mtime) alone. Returns True if
+    `path` was replaced."""
+    if _same_bytes(tmp, path):
+        os.remove(tmp)
+        return False
+    os.replace(tmp, path)
+    return True
+
+
+def publish(stage_dir, site_dir, paths):
+    """Hardlink each of `paths` (files under `stage_dir`) to the same relative
+    path under `site_dir`, copying (mtime included) where hardlinks fail. Files
+    in stage_dir not listed are deleted, so the stage holds exactly this build's
+    artifacts. Returns the number of files linked or copied."""
+    keep = set()
+    published = 0
+    for src in paths:
+        src = os.path.abspath(src)
+        keep.add(src)
+        dst = os.path.join(site_dir, os.path.relpath(src, stage_dir))
+        try:
+            if os.path.samefile(src, dst):
+                continue  # `--dirty` build: already linked
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = dst + ".tmp"
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)  # another filesystem, or no hardlinks there
+        os.replace(tmp, dst)
+        published += 1
+    for root, _, names in os.walk(stage_dir):
+        for n in names:
+            p = os.path.abspath(os.path.join(root, n))
+            if p not in keep:
+                os.remove(p)
+    return published
+
+
+class ArtifactWriter:
+    def __init__(self, threads=None):
+        self.threads = max(1, _env_int("GEN_ARTIFACT_THREADS", DEFAULT_THREADS)
+                           if threads is None else threads)
+        self.written = self.skipped = 0
+        self.paths = []
+        self._pool = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+        self._pending = []
+
+    def _count(self, written):
+        if written:
+            self.written += 1
+        else:
+            self.skipped += 1
+
+    def write(self, path, data):
+        self.paths.append(path)
+        if self._pool is None:
+            self._count(write_if_changed(path, data))
+        else:
+            self._pending.append(self._pool.submit(write_if_changed, path, data))
+
+    def close(self):
+        """Wait for every write; re-raises the first one that failed."""
+        if self._pool is None:
+            return
+        try:
+            for future in self._pending:
+                self._count(future.result())
+        finally:
+            self._pending = []
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Benchmark + check for the BM25 index (bm25.py) as the corpus grows.
+
+Replicates the rows of a built feed 1x, 4x, 16x (each copy under distinct chunk
+keys) and for each size reports: index build time and size, the startup cost
+of the precomputed index (mmap open) against re-tokenising the corpus, and
+query latency (p50/p95) over a fixed query set. At 1x the mmap'd scores are
+also checked against a plain in-memory BM25; exits non-zero on a mismatch.
+
+  python generate_feed.py --out /tmp/feed.jsonl
+  python bench_bm25.py /tmp/feed.jsonl [--scales 1,4,16]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from bm25 import B, K1, BM25Index, BM25Sink, terms_of
+
+QUERIES = [
+    "xcm fee estimation", "deploy smart contract hardhat", "asset hub teleport",
+    "runtime upgrade", "polkadot js api connect", "parachain collator setup",
+    "staking nominate validator", "evm precompile address", "bulletin chain storage",
+    "weight benchmarking pallet", "ink contract", "light client smoldot",
+]
+
+
+def scaled_lines(feed, scale):
+    with open(feed, "rb") as f:
+        lines = f.readlines()
+    for copy in range(scale):
+        for line in lines:
+            if copy:
+                row = json.loads(line)
+                row["url"] += f"/copy-{copy}"
+                line = (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+            yield line
+
+
+def naive_scores(lines, query):
+    docs = [Counter(terms_of(r["title"] + "\n" + r["text"])) for r in map(json.loads, lines)]
+    n, avgdl = len(docs), sum(sum(d.values()) for d in docs) / len(docs)
+    scores = {}
+    for term in set(terms_of(query)):
+        df = sum(1 for d in docs if term in d)
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for i, d in enumerate(docs):
+            tf = d.get(term)
+            if tf:
+                dl = sum(d.values())
+                scores[i] = scores.get(i, 0.0) + idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * dl / avgdl))
+    return scores
+
+
+def check(lines, path):
+    bad = 0
+    with BM25Index(path) as idx:
+        for q in QUERIES:
+            want = naive_scores(lines, q)
+            top = sorted(want.items(), key=lambda kv: -kv[1])[:10]
+            got = idx.search(q, k=10)
+            if [round(s, 3) for _, s in got] != [round(s, 3) for _, s in top]:
+                print(f"MISMATCH: {q!r}", file=sys.stderr)
+                bad += 1
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("feed")
+    ap.add_argument("--scales", default="1,4,16")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    bad = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in map(int, args.scales.split(",")):
+            lines = list(scaled_lines(args.feed, scale))
+            path = os.path.join(tmp, f"x{scale}.bm25")
+            t = time.perf_counter()
+            with BM25Sink(path) as sink:
+                for line in lines:
+                    sink.write_line(line)
+            build = time.perf_counter() - t
+
+            t = time.perf_counter()
+            for row in map(json.loads, lines):
+                Counter(terms_of(row["title"] + "\n" + row["text"]))
+            retokenise = time.perf_counter() - t
+
+            t = time.perf_counter()
+            idx = BM25Index(path)
+            load = time.perf_counter() - t
+            lat = []
+            for _ in range(args.repeat):
+                for q in QUERIES:
+                    t = time.perf_counter()
+                    idx.search(q, k=10)
+                    lat.append(time.perf_counter() - t)
+            idx.close()
+            lat.sort()
+            print(f"{scale:>3}x {len(lines):>6} chunks: build {build * 1e3:7.1f} ms, "
+                  f"{os.path.getsize(path) / 1e6:5.1f} MB; startup mmap {load * 1e3:.2f} ms "
+                  f"vs re-tokenise {retokenise * 1e3:.0f} ms; query p50 "
+                  f"{lat[len(lat) // 2] * 1e3:.2f} ms, p95 {lat[int(len(lat) * 0.95)] * 1e3:.2f} ms")
+            if scale == 1:
+                bad += check(lines, path)
+    print(f"parity: {len(QUERIES)} queries vs in-memory BM25, {bad} mismatches")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Parity check + benchmark: the mkdocs hook's feed pass with snippet expansions
+captured from the site render (snippet_capture.py) vs resolving every page again.
+
+Runs a real `mkdocs build` in-process (the hooks install the capture), then
+processes every page twice more without the page cache: once served from the
+capture, once with it cleared. Every page's full process_page() result — body,
+metadata, rows, include edges — must be identical. Exits non-zero otherwise,
+and when nothing was served from the capture (the check would prove nothing).
+--check runs each pass once.
+
+--against FEED skips the build: it regenerates the feed with generate_feed.py
+in a fresh process (nothing captured, no page cache) and requires it to be
+byte-identical to FEED, the llms-full.jsonl an mkdocs build (which serves the
+feed pass from the capture) already wrote. CI uses that, after its own build.
+
+  SOCIAL_CARDS=false python bench_capture.py [--repeat 3] [--check]
+  python bench_capture.py --against ../site/ai/llms-full.jsonl
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+from jinja2 import Environment
+
+import generate_feed as g
+import snippet_capture
+import var_usage
+
+
+def feed_pass(paths, docs, variables, env, snippets, base_url):
+    var_usage._TEMPLATES.clear()  # both passes compile their templates from cold
+    t = time.perf_counter()
+    pages = [g.process_page(p, docs, variables, env, snippets, base_url, "polkadot-docs")
+             for p in paths]
+    return time.perf_counter() - t, pages
+
+
+def against(feed):
+    """0 if a standalone, uncaptured generator run reproduces `feed` exactly."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "feed.jsonl")
+        subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                     "generate_feed.py"), "--no-cache", "--out", out],
+                       check=True, stdout=subprocess.DEVNULL)
+        with open(out, "rb") as f:
+            fresh = f.read().splitlines()
+    with open(feed, "rb") as f:
+        built = f.read().splitlines()
+    bad = [i for i, (a, b) in enumerate(zip(built, fresh)) if a != b]
+    for i in bad[:10]:
+        print(f"MISMATCH: row {i}: {json.loads(built[i]).get('url')}", file=sys.stderr)
+    print(f"parity: {len(built)} rows in {feed}, {len(fresh)} regenerated, {len(bad)} differ")
+    return 1 if bad or len(built) != len(fresh) else 0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=g.REPO_ROOT)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--check", action="store_true", help="parity only: one pass each")
+    ap.add_argument("--against", metavar="FEED",
+                    help="compare a built llms-full.jsonl with an uncaptured regeneration")
+    args = ap.parse_args()
+    if args.against:
+        return against(args.against)
+    if args.check:
+        args.repeat = 1
+
+    from mkdocs.commands.build import build
+    from mkdocs.config import load_config
+
+    os.chdir(args.root)  # mkdocs.yml's snippet base_path is relative to it
+    with tempfile.TemporaryDirectory() as site:
+        config = load_config(os.path.join(args.root, "mkdocs.yml"), site_dir=site)
+        t = time.perf_counter()
+        build(config)
+        built = time.perf_counter() - t
+
+    docs = os.path.join(args.root, "docs")
+    snippets = os.path.join(docs, ".snippets")
+    with open(os.path.join(docs, "variables.yml"), encoding="utf-8") as f:
+        variables = yaml.safe_load(f) or {}
+    env, base_url = Environment(), config["site_url"].rstrip("/")
+    paths = g.iter_markdown(docs)
+    capture = snippet_capture.shared()
+    rounds = [feed_pass(paths, docs, variables, env, snippets, base_url) for _ in range(args.repeat)]
+    reused, redone = capture.hits // args.repeat, capture.misses // args.repeat
+    captured_t, captured = min(t for t, _ in rounds), rounds[0][1]
+    capture.clear()
+    rounds = [feed_pass(paths, docs, variables, env, snippets, base_url) for _ in range(args.repeat)]
+    fresh_t, fresh = min(t for t, _ in rounds), rounds[0][1]
+
+    def dump(page):
+        return json.dumps(page, sort_keys=True, ensure_ascii=False, default=str)
+
+    bad = [p for p, a, b in zip(paths, captured, fresh) if dump(a) != dump(b)]
+    for path in bad[:10]:
+        print(f"MISMATCH: {os.path.relpath(path, args.root)}", file=sys.stderr)
+    print(f"parity: {len(paths)} pages, {reused} expansions reused, {redone} redone, "
+          f"{len(bad)} mismatches")
+    if not reused:
+        print("nothing reused: the site and the feed pass expand snippets with different "
+              "settings (GEN_SNIPPET_URL_DOWNLOAD?)", file=sys.stderr)
+    if not args.check:
+        print(f"mkdocs build {built:.1f} s; feed pass (no page cache): resolving "
+              f"{fresh_t * 1e3:.0f} ms, with captured expansions {captured_t * 1e3:.0f} ms "
+              f"({fresh_t / captured_t:.2f}x)")
+    return 1 if bad or not reused else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmark + check for the AI dropdown: the page-badges.html template slot vs
+the fallback that scans rendered HTML for `.page-header-row` (hooks/ai_feed.py).
+
+Takes the largest rendered pages of a built site, cuts the dropdown(s) back out
+of each, and times per page:
+
+  - fallback: _inject_dropdown() over the whole document (regex + div depth);
+  - slot: what the template path costs instead — rendering render_badges()
+    with the dropdown vs without, plus on_post_page's "already rendered" check.
+
+The fallback must put the dropdown back exactly where the slot rendered it
+(same bytes); exits non-zero otherwise.
+
+  SOCIAL_CARDS=false mkdocs build -d /tmp/site
+  python bench_dropdown.py /tmp/site [--pages 20] [--repeat 20]
+"""
+import argparse
+import importlib.util
+import os
+import re
+import sys
+import time
+
+from jinja2 import Environment, FileSystemLoader
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WIDGET_RE = re.compile(r'<div class="?ai-file-actions-container\b')
+
+
+def load_hook():
+    spec = importlib.util.spec_from_file_location("ai_feed", os.path.join(REPO_ROOT, "hooks", "ai_feed.py"))
+    hook = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(hook)
+    return hook
+
+
+def cut_widgets(hook, html):
+    """(html without the dropdowns, [dropdown html, ...])."""
+    parts, widgets, pos = [], [], 0
+    for m in WIDGET_RE.finditer(html):
+        depth = 1
+        for t in hook._DIV_TAG_RE.finditer(html, m.end()):
+            depth += 1 if t.group(0)[1] != "/" else -1
+            if depth == 0:
+                break
+        parts.append(html[pos:m.start()])
+        widgets.append(html[m.start():t.end()])
+        pos = t.end()
+    parts.append(html[pos:])
+    return "".join(parts), widgets
+
+
+def best(fn, repeat):
+    t_best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        t_best = min(t_best, time.perf_counter() - t)
+    return t_best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("site", help="a built site directory")
+    ap.add_argument("--pages", type=int, default=20, help="how many of the largest pages")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    hook = load_hook()
+    paths = [os.path.join(root, n) for root, _, names in os.walk(args.site)
+             for n in names if n == "index.html"]
+    paths = sorted(paths, key=os.path.getsize, reverse=True)[:args.pages]
+    macros = Environment(loader=FileSystemLoader(os.path.join(REPO_ROOT, "material-overrides"))) \
+        .get_template("partials/page-badges.html").module
+    badges = {"tutorial_badge": "Intermediate", "test_workflow": "bench"}
+
+    bad, rows = [], []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        bare, widgets = cut_widgets(hook, html)
+        if not widgets or len(set(widgets)) != 1:
+            continue
+        widget = widgets[0]
+        if hook._inject_dropdown(bare, widget) != html:
+            bad.append(path)
+
+        def slot(actions):
+            for _ in widgets:  # one badge row per variant on toggle pages
+                macros.render_badges(badges, None, actions)
+            return actions is not None and hook._WIDGET_CLASS in html
+
+        fallback = best(lambda: hook._inject_dropdown(bare, widget), args.repeat)
+        with_slot, without = best(lambda: slot(widget), args.repeat), best(lambda: slot(None), args.repeat)
+        rows.append((os.path.relpath(path, args.site), len(html), fallback, max(0.0, with_slot - without)))
+
+    for path in bad[:10]:
+        print(f"MISMATCH: {path}", file=sys.stderr)
+    print(f"parity: {len(rows)} pages, {len(bad)} mismatches")
+    for rel, size, fallback, slot in rows:
+        print(f"{size / 1e3:8.0f} kB  fallback {fallback * 1e6:7.0f} us  slot {slot * 1e6:5.1f} us  {rel}")
+    if rows:
+        total_fb, total_slot = sum(r[2] for r in rows), sum(r[3] for r in rows)
+        print(f"total over {len(rows)} pages: fallback {total_fb * 1e3:.2f} ms, "
+              f"slot {total_slot * 1e3:.3f} ms")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
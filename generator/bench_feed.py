@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Synthetic-corpus benchmark for generate_feed: end-to-end build() and the hot
+functions, at multiples of the real corpus size.
+
+The real docs are profiled first — per page: word count, heading depths,
+fenced blocks, `--8<--` includes (whole-file or line-range) and `{{ }}`
+expressions, plus how many pages share each snippet. Each synthetic tree is
+generated (seeded) by drawing page shapes from that profile, so heading depth,
+fence density, snippet fan-out and template usage track the real corpus; text
+comes from the real vocabulary and expressions from the real variables.yml.
+At Nx there are N times the pages and N times the snippet files.
+
+For each scale the generator runs end to end as a subprocess (--no-cache,
+--profile, remote includes off), and clean_body / extract_sections /
+estimate_tokens are timed in-process over the synthetic pages. Everything is
+written as JSON; --compare prints the ratios against an earlier run.
+
+  python bench_feed.py [--scales 1,10,100] [--out bench.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import yaml
+from jinja2 import Environment
+
+import generate_feed as g
+
+BENCH_SCHEMA = 1
+HEADING_RE = re.compile(r"^(#{2,3})[ \t]+\S", re.M)
+FENCE_RE = re.compile(r"^[ \t]*(```|~~~)", re.M)
+INCLUDE_RE = re.compile(r"""--8<--[ \t]+["']([^"']+)["']""")
+EXPR_RE = re.compile(r"\{\{.*?\}\}")
+RANGE_RE = re.compile(r":-?\d*:-?\d*$")
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z'-]{1,15}")
+LANGS = ["bash", "js", "ts", "py", "rust", "json", "toml", "sol", "html"]
+
+
+def profile_corpus(root):
+    """Per-page shapes of the real docs, plus vocabulary and snippet fan-out."""
+    with open(os.path.join(root, "llms_config.json"), encoding="utf-8") as f:
+        cfg = json.load(f)
+    shapes, words, targets = [], Counter(), Counter()
+    for path in g.feed_paths(os.path.join(root, "docs"), cfg):
+        with open(path, encoding="utf-8") as f:
+            _, body = g.split_front_matter(f.read())
+        includes = INCLUDE_RE.findall(body)
+        targets.update(t for t in includes if not g._is_url(t))
+        page_words = WORD_RE.findall(body)
+        words.update(w.lower() for w in page_words)
+        shapes.append({"words": len(page_words),
+                       "heads": [len(h) for h in HEADING_RE.findall(body)],
+                       "fences": len(FENCE_RE.findall(body)) // 2,
+                       "includes": len(includes),
+                       "ranged": sum(1 for t in includes if RANGE_RE.search(t)),
+                       "exprs": len(EXPR_RE.findall(body))})
+    return {"pages": len(shapes), "shapes": shapes,
+            "vocab": [w for w, _ in words.most_common(4000)],
+            "snippets": max(1, len(targets)),
+            "fan_out": round(sum(targets.values()) / max(1, len(targets)), 2)}
+
+
+def _leaf_paths(node, prefix=""):
+    if isinstance(node, dict):
+        for k, v in node.items():
+            yield from _leaf_paths(v, f"{prefix}{k}.")
+    elif not isinstance(node, list):
+        yield prefix[:-1]
+
+
+def _text(rng, vocab, n):
+    words = rng.choices(vocab, k=max(1, n))
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+
+def _snippet(rng, vocab, lines):
+    return "".join(f"    let {rng.choice(vocab)}_{i} = {rng.choice(vocab)}({i});\n"
+                   for i in range(lines))
+
+
+def make_corpus(root, profile, variables_path, scale, seed=0):
+    """Write a synthetic docs tree `scale` times the real one under `root`;
+    returns (docs dir, snippets dir, page count, total bytes)."""
+    rng = random.Random(seed * 1000 + scale)
+    vocab = profile["vocab"]
+    docs, snippets = os.path.join(root, "docs"), os.path.join(root, "docs", ".snippets")
+    with open(variables_path, encoding="utf-8") as f:
+        var_paths = list(_leaf_paths(yaml.safe_load(f) or {}))
+    pool = []
+    for i in range(profile["snippets"] * scale):
+        rel = f"code/bench/s{i // 100:03d}/snip-{i:05d}.{rng.choice(LANGS)}"
+        lines = rng.randint(20, 200)
+        os.makedirs(os.path.dirname(os.path.join(snippets, rel)), exist_ok=True)
+        with open(os.path.join(snippets, rel), "w", encoding="utf-8") as f:
+            f.write(_snippet(rng, vocab, lines))
+        pool.append((rel, lines))
+    total = 0
+    for n in range(profile["pages"] * scale):
+        shape = rng.choice(profile["shapes"])
+        heads = shape["heads"] or [2]
+        per_section = max(1, shape["words"] // (len(heads) + 1))
+        # Scatter the page's fences, includes and expressions over its sections.
+        slots = {kind: Counter(rng.randrange(len(heads)) for _ in range(shape[kind]))
+                 for kind in ("fences", "includes", "exprs")}
+        ranged = shape["ranged"]
+        title = _text(rng, vocab, 4)[:-1]
+        out = [f"---\ntitle: {title}\ndescription: {_text(rng, vocab, 12)}\n---\n\n# {title}\n\n",
+               _text(rng, vocab, per_section), "\n"]
+        for s, depth in enumerate(heads):
+            out.append(f"\n{'#' * depth} {_text(rng, vocab, rng.randint(2, 6))[:-1]}\n\n")
+            words = _text(rng, vocab, per_section).split(" ")
+            for _ in range(slots["exprs"][s]):
+                words.insert(rng.randrange(len(words) + 1), "{{ " + rng.choice(var_paths) + " }}")
+            out.append(" ".join(words) + "\n")
+            for _ in range(slots["includes"][s]):
+                rel, lines = rng.choice(pool)
+                if ranged:
+                    start = rng.randint(1, lines)
+                    rel, ranged = f"{rel}:{start}:{min(lines, start + rng.randint(3, 30))}", ranged - 1
+                out.append(f"\n```{rel.rsplit('.', 1)[-1].split(':')[0]}\n--8<-- '{rel}'\n```\n")
+            for _ in range(max(0, slots["fences"][s] - slots["includes"][s])):
+                out.append(f"\n```{rng.choice(LANGS)}\n{_snippet(rng, vocab, rng.randint(2, 15))}```\n")
+        path = os.path.join(docs, f"section-{n // 50:04d}", f"page-{n:06d}.md")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = "".join(out)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        total += len(data.encode("utf-8"))
+    return docs, snippets, profile["pages"] * scale, total
+
+
+def time_build(tmp, docs, snippets, variables_path, config, jobs):
+    out, prof = os.path.join(tmp, "feed.jsonl"), os.path.join(tmp, "profile.json")
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate_feed.py"),
+           "--docs", docs, "--vars", variables_path, "--snippets", snippets, "--config", config,
+           "--out", out, "--no-cache", "--jobs", str(jobs), "--profile", prof]
+    env = dict(os.environ, GEN_SNIPPET_URL_DOWNLOAD="0")
+    t = time.perf_counter()
+    subprocess.run(cmd, check=True, env=env, stdout=subprocess.DEVNULL)
+    wall = time.perf_counter() - t
+    with open(out, "rb") as f:
+        chunks = sum(1 for _ in f)
+    with open(prof, encoding="utf-8") as f:
+        stages = json.load(f)["stages"]
+    return wall, chunks, {name: round(s["seconds"], 4) for name, s in stages.items()}
+
+
+def time_functions(docs, snippets, variables_path, limit, repeat):
+    """Best-of-`repeat` seconds for clean_body / extract_sections / estimate_tokens
+    over (up to `limit` of) the synthetic pages."""
+    with open(variables_path, encoding="utf-8") as f:
+        variables = yaml.safe_load(f) or {}
+    env = Environment()
+    raws = []
+    for path in g.iter_markdown(docs)[:limit]:
+        with open(path, encoding="utf-8") as f:
+            raws.append(f.read())
+    bodies = [g.clean_body(raw, variables, env, snippets)[1] for raw in raws]
+    result = {}
+    for name, fn, inputs in (
+            ("clean_body", lambda raw: g.clean_body(raw, variables, env, snippets), raws),
+            ("extract_sections", g.extract_sections, bodies),
+            ("estimate_tokens", g.estimate_tokens, bodies)):
+        best = float("inf")
+        for _ in range(repeat):
+            t = time.perf_counter()
+            for x in inputs:
+                fn(x)
+            best = min(best, time.perf_counter() - t)
+        result[name] = {"calls": len(inputs), "seconds": round(best, 4),
+                        "us_per_call": round(best / max(1, len(inputs)) * 1e6, 1)}
+    return result
+
+
+def compare(old, new):
+    old_runs = {r["scale"]: r for r in old["runs"]}
+    for run in new["runs"]:
+        prev = old_runs.get(run["scale"])
+        if prev is None:
+            continue
+        parts = [f"build {run['build_seconds'] / prev['build_seconds']:.2f}x"]
+        parts += [f"{name} {f['seconds'] / prev['functions'][name]['seconds']:.2f}x"
+                  for name, f in run["functions"].items()
+                  if prev["functions"].get(name, {}).get("seconds")]
+        print(f"{run['scale']:>4}x vs {old.get('git_head', '?')[:10]}: " + ", ".join(parts))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=g.REPO_ROOT)
+    ap.add_argument("--scales", default="1,10,100")
+    ap.add_argument("--jobs", "-j", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--function-pages", type=int, default=2000,
+                    help="pages the per-function timings run over")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    ap.add_argument("--compare", default=None, metavar="JSON", help="an earlier --out to compare with")
+    args = ap.parse_args()
+
+    config = os.path.join(args.root, "llms_config.json")
+    variables_path = os.path.join(args.root, "docs", "variables.yml")
+    profile = profile_corpus(args.root)
+    head = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                          cwd=args.root).stdout.strip()
+    results = {"schema_version": BENCH_SCHEMA, "git_head": head,
+               "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+               "python": platform.python_version(), "jobs": args.jobs, "seed": args.seed,
+               "corpus": {k: profile[k] for k in ("pages", "snippets", "fan_out")}, "runs": []}
+    for scale in map(int, args.scales.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            t = time.perf_counter()
+            docs, snippets, pages, size = make_corpus(tmp, profile, variables_path, scale, args.seed)
+            generated = time.perf_counter() - t
+            wall, chunks, stages = time_build(tmp, docs, snippets, variables_path, config, args.jobs)
+            functions = time_functions(docs, snippets, variables_path, args.function_pages, args.repeat)
+        results["runs"].append({"scale": scale, "pages": pages, "bytes": size, "chunks": chunks,
+                                "generate_seconds": round(generated, 3),
+                                "build_seconds": round(wall, 3), "stages": stages,
+                                "functions": functions})
+        print(f"{scale:>4}x {pages:>7} pages {size / 1e6:7.1f} MB: build {wall:7.2f} s "
+              f"({chunks} chunks, {pages / wall:.0f} pages/s); " +
+              ", ".join(f"{n} {f['us_per_call']:.0f} us" for n, f in functions.items()))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
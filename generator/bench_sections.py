@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Parity check + benchmark: normalize_body/extract_sections vs the original
+multi-pass path (comment sub -> attr sub -> splitlines -> per-line regexes).
+
+Resolves every feed page once (snippets + variables), then runs both paths over
+the resulting bodies and over a set of edge cases (CRLF, U+2028, nested and
+mixed fences, headings inside fences, trailing #s, attr blocks on headings).
+It also runs process_page() over every page's bytes with CRLF and with CR line
+endings, which must give exactly the LF result (front matter, title, rows).
+Exits non-zero on any difference; --check stops there, without timing (CI).
+
+  GEN_SNIPPET_URL_DOWNLOAD=0 python bench_sections.py [--repeat 5] [--check]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import yaml
+from jinja2 import Environment
+
+import generate_feed as g
+
+EDGE_CASES = [
+    "intro\n## A\ntext\n### B {#b}\nmore\n",
+    "## A\r\nx\r\n## B\r\n",
+    "## A ## B\nx\n",
+    "```\n## not a heading\n~~~\n## still not\n```\n## Yes\n",
+    "~~~md\n```\n## inside\n~~~\n## after\n",
+    "##\n## \n##x\n####### seven\n#### four\n## Closed ##  \n",
+    "  ```\n## in indented fence\n  ```\n## out\n",
+    "<!-- ## hidden\n``` -->\n## Visible <!-- c --> {: .cls }\ntext {target=_blank}\n",
+    "## Ünïcödé ✓\n ## nbsp-indented\n## Tabs\t\there\t#\n",
+    "\n## After a blank first line\n\n\n## Again\n",
+    "no headings at all",
+    "",
+]
+
+
+def legacy(body):
+    body = g.ATTR_BLOCK_RE.sub("", g.HTML_COMMENT_RE.sub("", body))
+    heads = g._heads_lines(body, g.MAX_DEPTH)
+    return body, heads
+
+
+def current(body):
+    body = g.normalize_body(body)
+    return body, g._heads(body, g.MAX_DEPTH)
+
+
+def resolved_bodies(root):
+    with open(os.path.join(root, "llms_config.json"), encoding="utf-8") as f:
+        cfg = json.load(f)
+    with open(os.path.join(root, "docs", "variables.yml"), encoding="utf-8") as f:
+        variables = yaml.safe_load(f) or {}
+    env, snippets = Environment(), os.path.join(root, "docs", ".snippets")
+    out = []
+    for path in g.feed_paths(os.path.join(root, "docs"), cfg):
+        with open(path, encoding="utf-8") as f:
+            _, body = g.split_front_matter(f.read())
+        out.append(g.resolve_vars(g.resolve_snippets(body, snippets), variables, env))
+    return out
+
+
+def line_ending_mismatches(root):
+    """Feed pages whose process_page() result changes when their bytes are
+    rewritten with CRLF or CR line endings."""
+    with open(os.path.join(root, "llms_config.json"), encoding="utf-8") as f:
+        cfg = json.load(f)
+    with open(os.path.join(root, "docs", "variables.yml"), encoding="utf-8") as f:
+        variables = yaml.safe_load(f) or {}
+    docs, env = os.path.join(root, "docs"), Environment()
+    snippets = os.path.join(docs, ".snippets")
+    bad = []
+    for path in g.feed_paths(docs, cfg):
+        with open(path, "rb") as f:
+            lf = f.read().replace(b"\r\n", b"\n")
+        pages = [g.process_page(path, docs, variables, env, snippets, "https://docs.example",
+                                "bench", raw_bytes=raw)
+                 for raw in (lf, lf.replace(b"\n", b"\r\n"), lf.replace(b"\n", b"\r"))]
+        if pages[1] != pages[0] or pages[2] != pages[0]:
+            bad.append(os.path.relpath(path, root))
+    return bad
+
+
+def bench(fn, bodies, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for b in bodies:
+            fn(b)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=g.REPO_ROOT)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--check", action="store_true", help="parity only, no benchmark")
+    args = ap.parse_args()
+
+    bodies = resolved_bodies(args.root)
+    bad = [i for i, b in enumerate(EDGE_CASES + bodies) if legacy(b) != current(b)]
+    for i in bad[:10]:
+        print(f"MISMATCH: {'edge case' if i < len(EDGE_CASES) else 'page'} #{i}", file=sys.stderr)
+    print(f"parity: {len(EDGE_CASES)} edge cases + {len(bodies)} pages, {len(bad)} mismatches")
+    endings = line_ending_mismatches(args.root)
+    for path in endings[:10]:
+        print(f"LINE ENDINGS: {path}", file=sys.stderr)
+    print(f"line endings: {len(bodies)} pages as CRLF and CR, {len(endings)} mismatches")
+    bad += endings
+    if args.check:
+        return 1 if bad else 0
+
+    old_t, new_t = bench(legacy, bodies, args.repeat), bench(current, bodies, args.repeat)
+    size = sum(len(b) for b in bodies)
+    print(f"normalize+sections over {size / 1e6:.1f} MB: original {old_t * 1e3:.1f} ms, "
+          f"single-pass {new_t * 1e3:.1f} ms ({old_t / new_t:.1f}x)")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
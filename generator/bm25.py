@@ -0,0 +1,205 @@
+"""Precomputed BM25 inverted index over feed chunks, and an mmap loader for it.
+
+BM25Sink is a sinks-style sink (tee it with the main feed sink) that tokenises
+each row's `title` + `text` (lowercased \\w+ runs) and, on close, writes one
+little-endian binary file — site/ai/llms-full.bm25 in the build:
+
+  header      "<8s5I3f": b"BM25IDX1", docs, terms, postings, doc_keys_len,
+              terms_len, avgdl, k1, b
+  doc_len     uint32[docs]          tokens per chunk
+  doc_key_off uint32[docs + 1]      into doc_keys
+  term_off    uint32[terms + 1]     into terms
+  term_post   uint32[terms + 1]     into postings (df = next - this)
+  idf         float32[terms]        ln(1 + (N - df + 0.5) / (df + 0.5))
+  post_doc    uint32[postings]      doc ids, ascending within a term
+  post_tf     uint16[postings]      term frequency (saturates at 65535)
+  doc_keys    utf-8 chunk keys (feed_index.row_key), concatenated
+  terms       utf-8 terms, concatenated in byte order
+
+BM25Index maps the file and answers queries straight from it: a term is a
+binary search over the term table and its postings are zero-copy slices, so
+loading costs nothing however large the corpus is.
+
+  with BM25Index("site/ai/llms-full.bm25") as idx:
+      idx.search("xcm fee estimation", k=5)   # -> [(chunk key, score), ...]
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from collections import Counter
+
+from artifact_writer import replace_if_changed
+from feed_index import row_key
+from sinks import dumps
+
+MAGIC = b"BM25IDX1"
+HEADER = struct.Struct("<8s5I3f")
+K1, B = 1.2, 0.75
+TERM_RE = re.compile(r"\w+")
+
+
+def terms_of(text):
+    return TERM_RE.findall(text.lower())
+
+
+class BM25Sink:
+    def __init__(self, path, k1=K1, b=B):
+        self.path = path
+        self.k1, self.b = k1, b
+        self.rows = 0
+        self._keys, self._lens = [], array("I")
+        self._postings = {}  # term -> (array of doc ids, array of tfs)
+
+    def begin_page(self, page_id, categories):
+        pass
+
+    def write(self, row):
+        self.write_line(dumps(row).encode("utf-8"))
+
+    def write_line(self, data, tokens=None):
+        row = json.loads(data)
+        doc = self.rows
+        terms = terms_of(row["title"] + "\n" + row["text"])
+        self._keys.append(row_key(row))
+        self._lens.append(len(terms))
+        for term, tf in Counter(terms).items():
+            post = self._postings.get(term)
+            if post is None:
+                post = self._postings[term] = (array("I"), array("H"))
+            post[0].append(doc)
+            post[1].append(min(tf, 0xFFFF))
+        self.rows += 1
+
+    def close(self, commit=True):
+        if not commit:
+            return
+        n = self.rows
+        terms = sorted(self._postings, key=lambda t: t.encode("utf-8"))
+        term_blob, doc_blob = bytearray(), bytearray()
+        term_off, term_post, doc_key_off = array("I", [0]), array("I", [0]), array("I", [0])
+        idf, post_doc, post_tf = array("f"), array("I"), array("H")
+        for term in terms:
+            docs, tfs = self._postings[term]
+            term_blob += term.encode("utf-8")
+            term_off.append(len(term_blob))
+            post_doc.extend(docs)
+            post_tf.extend(tfs)
+            term_post.append(len(post_doc))
+            idf.append(math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5)))
+        for key in self._keys:
+            doc_blob += key.encode("utf-8")
+            doc_key_off.append(len(doc_blob))
+        avgdl = sum(self._lens) / n if n else 0.0
+        header = HEADER.pack(MAGIC, n, len(terms), len(post_doc), len(doc_blob), len(term_blob),
+                             avgdl, self.k1, self.b)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".tmp", "wb") as f:
+            f.write(header)
+            for arr in (self._lens, doc_key_off, term_off, term_post, idf, post_doc, post_tf):
+                f.write(_little_endian(arr).tobytes())
+            f.write(doc_blob)
+            f.write(term_blob)
+        replace_if_changed(self.path + ".tmp", self.path)  # unchanged: keep the mtime
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+
+def _little_endian(arr):
+    if sys.byteorder == "little":
+        return arr
+    arr = array(arr.typecode, arr)
+    arr.byteswap()
+    return arr
+
+
+class BM25Index:
+    def __init__(self, path):
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.docs, self.terms, postings, keys_len, terms_len,
+         self.avgdl, self.k1, self.b) = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a BM25 index")
+        view = self._view = memoryview(self._mm)
+        pos = HEADER.size
+        sections = {}
+        for name, code, count in (("doc_len", "I", self.docs), ("doc_key_off", "I", self.docs + 1),
+                                  ("term_off", "I", self.terms + 1), ("term_post", "I", self.terms + 1),
+                                  ("idf", "f", self.terms), ("post_doc", "I", postings),
+                                  ("post_tf", "H", postings)):
+            size = array(code).itemsize * count
+            sections[name] = _cast(view[pos:pos + size], code)
+            pos += size
+        self.__dict__.update(sections)
+        self._keys = view[pos:pos + keys_len]
+        self._terms = view[pos + keys_len:pos + keys_len + terms_len]
+
+    def term_id(self, term):
+        """Index of `term` in the term table (binary search), or -1."""
+        want, lo, hi = term.encode("utf-8"), 0, self.terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            got = self._terms[self.term_off[mid]:self.term_off[mid + 1]].tobytes()
+            if got < want:
+                lo = mid + 1
+            elif got > want:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def postings(self, term):
+        """(idf, doc ids, tfs) for `term`; empty slices if it never occurs."""
+        t = self.term_id(term)
+        if t < 0:
+            return 0.0, (), ()
+        start, end = self.term_post[t], self.term_post[t + 1]
+        return self.idf[t], self.post_doc[start:end], self.post_tf[start:end]
+
+    def doc_key(self, doc):
+        return self._keys[self.doc_key_off[doc]:self.doc_key_off[doc + 1]].tobytes().decode("utf-8")
+
+    def search(self, query, k=10):
+        """Top-k (chunk key, BM25 score) for a free-text query."""
+        scores, k1, b, avgdl, doc_len = {}, self.k1, self.b, self.avgdl or 1.0, self.doc_len
+        for term in set(terms_of(query)):
+            idf, docs, tfs = self.postings(term)
+            for doc, tf in zip(docs, tfs):
+                norm = k1 * (1 - b + b * doc_len[doc] / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_key(doc), score) for doc, score in best]
+
+    def close(self):
+        for name in ("doc_len", "doc_key_off", "term_off", "term_post", "idf", "post_doc",
+                     "post_tf", "_keys", "_terms", "_view"):
+            view = self.__dict__.pop(name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _cast(view, code):
+    if sys.byteorder == "little":
+        return view.cast(code)
+    arr = array(code, view.tobytes())  # big-endian host: copy and swap
+    arr.byteswap()
+    return arr
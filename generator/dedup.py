@@ -0,0 +1,148 @@
+"""Near-duplicate chunk detection (MinHash) and an optional deduplicated feed.
+
+Each chunk's text is cut into word 4-gram shingles and summarised by a bottom-k
+MinHash sketch (the k smallest 64-bit shingle hashes — one hash per shingle
+rather than one per shingle per permutation). Chunks are clustered in feed
+order against earlier *canonical* chunks only: candidates are the canonicals
+sharing enough sketch values (an inverted index over sketch values, so no
+all-pairs pass), and a chunk whose estimated Jaccard similarity to its best
+candidate reaches the threshold joins that cluster; otherwise it becomes a
+canonical itself. Work per chunk is bounded by k and the candidate lists, so
+the pass is roughly linear in the corpus, and since canonicals always come
+first it runs on the row stream.
+
+DedupSink wraps the feed's sink. It always builds the report; with refs=True
+each duplicate row keeps its metadata (chunk_hash still hashes the original
+text) but its `text` is emptied, its token count zeroed, and it gains
+`duplicate_of` (the canonical's chunk key, feed_index.row_key) and `similarity`.
+
+  GEN_FEED_DEDUP=report|refs   mkdocs hook: write site/ai/llms-dedup.json (and
+                               with `refs`, deduplicate the published feed)
+"""
+import hashlib
+import heapq
+import json
+import os
+import re
+from collections import Counter
+
+from artifact_writer import replace_if_changed
+from feed_index import row_key
+
+WORD_RE = re.compile(r"\w+")
+SKETCH = 64
+SHINGLE = 4
+THRESHOLD = 0.8
+MIN_WORDS = 20
+
+
+def sketch(text, k=SKETCH, shingle=SHINGLE):
+    """Sorted bottom-k MinHash sketch of `text`'s word shingles."""
+    words = WORD_RE.findall(text.lower())
+    grams = {" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))}
+    hashes = {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little")
+              for g in grams}
+    return heapq.nsmallest(k, hashes), len(words)
+
+
+def similarity(a, b, k=SKETCH):
+    """Bottom-k estimate of the Jaccard similarity of two sketches."""
+    sa, sb = set(a), set(b)
+    union = heapq.nsmallest(k, sa | sb)
+    return sum(1 for h in union if h in sa and h in sb) / len(union) if union else 0.0
+
+
+class Deduper:
+    def __init__(self, threshold=THRESHOLD, k=SKETCH, min_words=MIN_WORDS):
+        self.threshold, self.k, self.min_words = threshold, k, min_words
+        self.chunks = 0
+        self._canon = []      # canonical id -> (key, title, sketch)
+        self._postings = {}   # sketch value -> [canonical ids]
+        self._clusters = {}   # canonical id -> [(key, similarity, tokens)]
+
+    def add(self, key, title, text, tokens=0):
+        """Cluster one chunk; returns (canonical key, similarity) for a duplicate,
+        else None (the chunk is canonical, or too short to judge)."""
+        self.chunks += 1
+        sk, words = sketch(text, self.k)
+        if words < self.min_words:
+            return None
+        need = max(1, int(len(sk) * self.threshold / 2))
+        shared = Counter(c for h in sk for c in self._postings.get(h, ()))
+        best, best_sim = None, 0.0
+        for cid, n in shared.items():
+            if n >= need:
+                sim = similarity(sk, self._canon[cid][2], self.k)
+                if sim > best_sim or (sim == best_sim and best is not None and cid < best):
+                    best, best_sim = cid, sim
+        if best is not None and best_sim >= self.threshold:
+            self._clusters.setdefault(best, []).append((key, round(best_sim, 3), tokens))
+            return self._canon[best][0], round(best_sim, 3)
+        cid = len(self._canon)
+        self._canon.append((key, title, sk))
+        for h in sk:
+            self._postings.setdefault(h, []).append(cid)
+        return None
+
+    def report(self):
+        clusters = []
+        for cid, dups in self._clusters.items():
+            key, title, _ = self._canon[cid]
+            clusters.append({"canonical": key, "title": title,
+                             "tokens_saved": sum(t for _, _, t in dups),
+                             "duplicates": [{"key": k, "similarity": s, "tokens": t} for k, s, t in dups]})
+        clusters.sort(key=lambda c: (-c["tokens_saved"], c["canonical"]))
+        return {"threshold": self.threshold, "sketch": self.k, "shingle": SHINGLE,
+                "min_words": self.min_words, "chunks": self.chunks,
+                "duplicates": sum(len(c["duplicates"]) for c in clusters),
+                "tokens_saved": sum(c["tokens_saved"] for c in clusters),
+                "clusters": clusters}
+
+
+class DedupSink:
+    def __init__(self, sink, report_path=None, refs=False, threshold=THRESHOLD):
+        """Forward rows to `sink`, clustering them on the way; with `refs`, forward
+        duplicates as references. The report goes to `report_path` on close."""
+        self.sink = sink
+        self.report_path = report_path
+        self.refs = refs
+        self.deduper = Deduper(threshold)
+
+    @property
+    def rows(self):
+        return self.sink.rows
+
+    def begin_page(self, page_id, categories):
+        self.sink.begin_page(page_id, categories)
+
+    def _reference(self, row):
+        dup = self.deduper.add(row_key(row), row["title"], row["text"], row["estimated_token_count"])
+        if dup is not None and self.refs:
+            return dict(row, text="", estimated_token_count=0, duplicate_of=dup[0], similarity=dup[1])
+        return None
+
+    def write(self, row):
+        self.sink.write(self._reference(row) or row)
+
+    def write_line(self, data, tokens=None):
+        row = json.loads(data)  # clustering needs the text anyway
+        ref = self._reference(row)
+        if ref is None:
+            self.sink.write_line(data, row["estimated_token_count"])
+        else:
+            self.sink.write(ref)
+
+    def close(self, commit=True):
+        self.sink.close(commit)
+        if commit and self.report_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.report_path)), exist_ok=True)
+            with open(self.report_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.deduper.report(), f, indent=1, ensure_ascii=False)
+                f.write("\n")
+            replace_if_changed(self.report_path + ".tmp", self.report_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
@@ -0,0 +1,79 @@
+"""Delta between two builds of llms-full.jsonl: ai/llms-delta.jsonl.
+
+Chunks are matched by key — their `url`, page URL + #anchor (feed_index.row_key)
+— and compared by the digests the feed index records (feed_index.py), so the
+previous build can be given as its feed or just its `.index.json`. The delta's first line is
+a header, then one line per chunk that differs, in new-feed order, then
+tombstones in old-feed order:
+
+  {"op": "delta", "schema_version": 1, "from": {"sha256": …, "chunks": …},
+   "to": {"sha256": …, "chunks": …}, "added": …, "changed": …, "meta": …,
+   "removed": …, "unchanged": …}
+  {"op": "added", <full row>}      new key
+  {"op": "changed", <full row>}    same key, different `text` — re-embed
+  {"op": "meta", <full row>}       same text, other fields moved (index, offsets,
+                                   page_version_hash, last_updated) — re-tag only
+  {"op": "removed", "page_id": …, "url": <chunk key>}
+
+Applying the delta's rows to the previous feed's chunk set (by key) yields the
+new one.
+"""
+import bisect
+import json
+import os
+
+from artifact_writer import replace_if_changed
+
+DELTA_SCHEMA = 1
+
+
+def _page_of(index):
+    """url -> page_id for an index (pages are contiguous offset ranges)."""
+    starts = sorted((off, page_id) for page_id, (off, _, _) in index["pages"].items())
+    offsets = [off for off, _ in starts]
+    return lambda entry: starts[bisect.bisect_right(offsets, entry[0]) - 1][1]
+
+
+def diff(old, new):
+    """[(op, url)] taking index `old` to index `new`; unchanged chunks omitted."""
+    ops = []
+    old_urls = old["urls"]
+    for url, entry in new["urls"].items():
+        prev = old_urls.get(url)
+        if prev is None:
+            ops.append(("added", url))
+        elif prev[2] != entry[2]:
+            ops.append(("changed", url))
+        elif prev[3] != entry[3]:
+            ops.append(("meta", url))
+    ops.extend(("removed", url) for url in old_urls if url not in new["urls"])
+    return ops
+
+
+def write_delta(path, old, new, feed_path):
+    """Write the delta from index `old` to index `new` (the index of the feed at
+    `feed_path`, whose rows are copied from it by offset). Returns the header."""
+    ops = diff(old, new)
+    counts = {op: 0 for op in ("added", "changed", "meta", "removed")}
+    for op, _ in ops:
+        counts[op] += 1
+    header = {"op": "delta", "schema_version": DELTA_SCHEMA,
+              "from": {"sha256": old["sha256"], "chunks": old["rows"]},
+              "to": {"sha256": new["sha256"], "chunks": new["rows"]},
+              **counts, "unchanged": new["rows"] - counts["added"] - counts["changed"] - counts["meta"]}
+    page_of = _page_of(old)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(feed_path, "rb") as feed, open(path + ".tmp", "wb") as out:
+        out.write((json.dumps(header) + "\n").encode("utf-8"))
+        for op, url in ops:
+            if op == "removed":
+                tomb = {"op": op, "page_id": page_of(old["urls"][url]), "url": url}
+                out.write((json.dumps(tomb, ensure_ascii=False) + "\n").encode("utf-8"))
+                continue
+            offset, length = new["urls"][url][:2]
+            feed.seek(offset)
+            line = feed.read(length)
+            # Splice the op into the already-serialised row rather than re-encoding it.
+            out.write(b'{"op": "' + op.encode("ascii") + b'", ' + line[1:])
+    replace_if_changed(path + ".tmp", path)  # unchanged: keep the mtime
+    return header
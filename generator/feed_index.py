@@ -0,0 +1,201 @@
+"""Byte-offset index for llms-full.jsonl, and an mmap reader that uses it.
+
+IndexSink is a sinks-style sink (tee it right after the main feed sink) that
+records where every row lands in the feed and writes `<feed>.index.json`:
+
+  {"schema_version": 1, "feed": "llms-full.jsonl", "rows": …, "bytes": …, "sha256": …,
+   "pages": {"<page_id>": [offset, length, rows], …},
+   "urls":  {"<chunk key>": [offset, length, text_digest, row_digest], …}}
+
+A chunk's key is its `url` (page URL + #anchor), with `~N` appended for part
+N >= 1 of a section split by a token budget (generate_feed.budget_sections).
+
+A page's rows are contiguous in the feed, so each page is one range; offsets
+are into the uncompressed feed. The digests (first 16 hex chars of the sha256
+of the chunk's `text` and of its whole line) let feed_delta.py diff two builds
+from their indexes alone. FeedReader mmaps the feed and answers lookups
+with one dict probe and one slice instead of a scan of the corpus:
+
+  with FeedReader("site/ai/llms-full.jsonl") as feed:
+      rows = feed.page("apps-build")
+      row = feed.chunk("https://docs.polkadot.com/apps/build/#set-up-your-project")
+      feed.range_header(feed.page_range("apps-build"))   # -> "bytes=0-9550"
+"""
+import gzip
+import hashlib
+import json
+import mmap
+import os
+
+from artifact_writer import replace_if_changed
+from sinks import dumps
+
+INDEX_SCHEMA = 1
+DIGEST_LEN = 16
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()[:DIGEST_LEN]
+
+
+def row_key(row):
+    sub = row.get("sub_index")
+    return f'{row["url"]}~{sub}' if sub else row["url"]
+
+
+def index_path(feed_path):
+    """Default sidecar location: llms-full.jsonl -> llms-full.index.json."""
+    return os.path.splitext(feed_path)[0] + ".index.json"
+
+
+class IndexSink:
+    def __init__(self, path, feed):
+        """`feed` is the main feed sink whose bytes are being indexed; its path
+        and sha256 go into the index header."""
+        self.path = path
+        self.feed = feed
+        self.rows = self.bytes = 0
+        self._pages, self._urls = {}, {}
+        self._page = None
+
+    def begin_page(self, page_id, categories):
+        self._page = page_id
+
+    def write(self, row):
+        self.write_line(dumps(row).encode("utf-8"))
+
+    def write_line(self, data, tokens=None):
+        row = json.loads(data)
+        self._urls[row_key(row)] = [self.bytes, len(data),
+                                  digest(row["text"].encode("utf-8")), digest(data)]
+        entry = self._pages.get(self._page)
+        if entry is None:
+            self._pages[self._page] = [self.bytes, len(data), 1]
+        else:
+            entry[1] += len(data)
+            entry[2] += 1
+        self.rows += 1
+        self.bytes += len(data)
+
+    def index(self, feed_name, sha256):
+        return {"schema_version": INDEX_SCHEMA, "feed": feed_name,
+                "rows": self.rows, "bytes": self.bytes, "sha256": sha256,
+                "pages": self._pages, "urls": self._urls}
+
+    def close(self, commit=True):
+        if not commit:
+            return
+        root = os.path.dirname(os.path.abspath(self.path))
+        feed_name = os.path.relpath(os.path.abspath(self.feed.path), root).replace(os.sep, "/")
+        os.makedirs(root, exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.index(feed_name, self.feed.sha256.hexdigest()), f,
+                      ensure_ascii=False, separators=(",", ":"))
+        replace_if_changed(self.path + ".tmp", self.path)  # unchanged: keep the mtime
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+
+def load_index(path):
+    with open(path, encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("schema_version") != INDEX_SCHEMA:
+        raise ValueError(f"{path}: unsupported index schema {index.get('schema_version')!r}")
+    return index
+
+
+def scan(feed_path):
+    """Index an existing feed (.jsonl or .jsonl.gz) by reading it through once —
+    for feeds written without a sidecar. Offsets are into the uncompressed rows."""
+    sink, h, page_id = IndexSink(None, None), hashlib.sha256(), None
+    with (gzip.open if feed_path.endswith(".gz") else open)(feed_path, "rb") as f:
+        for line in f:
+            h.update(line)
+            row_page = json.loads(line)["page_id"]
+            if row_page != page_id:
+                sink.begin_page(row_page, None)
+                page_id = row_page
+            sink.write_line(line)
+    return sink.index(os.path.basename(feed_path), h.hexdigest())
+
+
+def load(feed_or_index):
+    """The index for a feed or index path: its sidecar when that still matches the
+    feed's bytes, else a scan() of the feed."""
+    if feed_or_index.endswith(".json"):
+        return load_index(feed_or_index)
+    sidecar = index_path(feed_or_index)
+    try:
+        index = load_index(sidecar)
+        if index["bytes"] == os.path.getsize(feed_or_index):
+            with open(feed_or_index, "rb") as f:
+                if hashlib.sha256(f.read()).hexdigest() == index["sha256"]:
+                    return index
+    except (OSError, ValueError):
+        pass
+    return scan(feed_or_index)
+
+
+class FeedReader:
+    def __init__(self, feed_path, index=None):
+        """`index` is a path or an already-loaded index (default: the sidecar).
+        Raises ValueError if the index doesn't describe this feed's size."""
+        self.path = feed_path
+        if not isinstance(index, dict):
+            index = load_index(index or index_path(feed_path))
+        self.index = index
+        self._f = open(feed_path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        if size != self.index["bytes"]:
+            self._f.close()
+            raise ValueError(f"{feed_path}: index is stale ({self.index['bytes']} bytes indexed, {size} on disk)")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __contains__(self, key):
+        return key in self.index["pages"] or key in self.index["urls"]
+
+    def page_ids(self):
+        return self.index["pages"].keys()
+
+    def page_range(self, page_id):
+        """(offset, length) of all of a page's rows; KeyError if unknown."""
+        offset, length, _ = self.index["pages"][page_id]
+        return offset, length
+
+    def chunk_range(self, key):
+        """(offset, length) of the row for a chunk key (its url, with #anchor);
+        KeyError if unknown."""
+        offset, length = self.index["urls"][key][:2]
+        return offset, length
+
+    @staticmethod
+    def range_header(rng):
+        """HTTP Range header value for an (offset, length) pair."""
+        offset, length = rng
+        return f"bytes={offset}-{offset + length - 1}"
+
+    def raw(self, rng):
+        """The feed's bytes for an (offset, length) pair — whole JSONL lines."""
+        offset, length = rng
+        return self._mm[offset:offset + length]
+
+    def page(self, page_id):
+        return [json.loads(line) for line in self.raw(self.page_range(page_id)).splitlines()]
+
+    def chunk(self, key):
+        return json.loads(self.raw(self.chunk_range(key)))
+
+    def close(self):
+        if self._mm:
+            self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,103 @@
+"""File-change notification for generate_feed.py --watch.
+
+Uses watchdog (inotify on Linux, FSEvents/kqueue elsewhere) — it ships with
+mkdocs, so it is there wherever the site builds — and falls back to polling
+mtimes when it isn't installed. Either way changes() blocks until something
+under the watched roots changes, waits for the burst to settle (an editor's
+save is often several events), and yields the set of absolute paths touched.
+
+  for paths in Watcher([(docs_dir, True), (repo_root, False)]).changes():
+      ...
+"""
+import os
+import threading
+import time
+
+DEBOUNCE = 0.2
+POLL_INTERVAL = 1.0
+CHANGE_EVENTS = {"created", "modified", "deleted", "moved"}
+
+
+class Watcher:
+    def __init__(self, roots, debounce=DEBOUNCE, interval=POLL_INTERVAL):
+        """`roots`: [(directory, recursive)]."""
+        self.roots = [(os.path.abspath(d), recursive) for d, recursive in roots]
+        self.debounce, self.interval = debounce, interval
+        self._pending, self._lock, self._wake = set(), threading.Lock(), threading.Event()
+        self.backend = "polling"
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            self._observer = None
+            self._snapshot = self._scan()
+            return
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Content changes only: reads (opened/closed-no-write) would make
+                # every rebuild trigger the next.
+                if event.is_directory or event.event_type not in CHANGE_EVENTS:
+                    return
+                with watcher._lock:
+                    watcher._pending.add(os.path.abspath(event.src_path))
+                    if getattr(event, "dest_path", None):
+                        watcher._pending.add(os.path.abspath(event.dest_path))
+                watcher._wake.set()
+
+        self._observer = Observer()
+        for d, recursive in self.roots:
+            self._observer.schedule(Handler(), d, recursive=recursive)
+        self.backend = type(self._observer).__name__
+
+    def _scan(self):
+        snap = {}
+        for d, recursive in self.roots:
+            for root, dirs, names in os.walk(d):
+                for n in names:
+                    p = os.path.join(root, n)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    snap[p] = (st.st_mtime_ns, st.st_size)
+                if not recursive:
+                    dirs[:] = []
+        return snap
+
+    def _poll(self):
+        while True:
+            time.sleep(self.interval)
+            snap = self._scan()
+            changed = {p for p in snap.keys() | self._snapshot.keys()
+                       if snap.get(p) != self._snapshot.get(p)}
+            self._snapshot = snap
+            if changed:
+                return changed
+
+    def _drain(self):
+        self._wake.wait()
+        while True:  # settle: keep collecting until a quiet debounce window
+            self._wake.clear()
+            if not self._wake.wait(self.debounce):
+                break
+        with self._lock:
+            changed, self._pending = self._pending, set()
+        return changed
+
+    def changes(self):
+        """Yield sets of changed absolute paths, forever (Ctrl-C to stop)."""
+        if self._observer is None:
+            while True:
+                yield self._poll()
+        self._observer.start()
+        try:
+            while True:
+                changed = self._drain()
+                if changed:
+                    yield changed
+        finally:
+            self._observer.stop()
+            self._observer.join()
@@ -10,24 +10,63 @@ block-form, and remote `--8<--` syntaxes), matching the site build.
 
 `process_page()`/`chunk_row()` are the single source of truth for page → feed
 records; hooks/ai_feed.py (the mkdocs integration) imports them so the deployed
-feed and the CI-validated feed cannot diverge.
+feed and the CI-validated feed cannot diverge. `iter_pages()`/`iter_chunks()`
+expose the same pipeline lazily, and rows stream to sinks.py outputs as they
+are produced, so memory stays flat as the corpus grows.
 
-  python generate_feed.py --out llms-full.new.jsonl
+Unchanged pages are served from a persistent content-addressed cache (see
+page_cache.py); pass --no-cache or set GEN_FEED_CACHE=0 to reprocess everything.
+
+--chunk-budget MAX[:MIN] (or GEN_CHUNK_BUDGET, which the mkdocs hook honours too)
+opts into token-budgeted chunks; see budget_sections(). Without it the feed is
+papermoon's heading sections, unchanged. --watch keeps every page in memory
+and updates the feed on each save, reprocessing only the pages a change affects.
+
+Pages without template syntax skip Jinja, and each page records the variables.yml
+paths it reads (var_usage.py), so a variables.yml edit re-renders only the pages
+reading a changed value; --vars-affected [OLD] lists them without building.
+
+--profile [PATH] writes where the time goes, per stage and per page (profiling.py).
+
+  python generate_feed.py --out llms-full.new.jsonl [--jobs 0]
 """
 import argparse
+import bisect
+import collections
+import contextlib
 import hashlib
+import itertools
 import json
 import os
 import re
 import subprocess
 import sys
+import time
+import unicodedata
 from datetime import datetime, timezone
 
 import yaml
 from jinja2 import Environment
 
+import bm25
+import dedup
+import feed_delta
+import feed_index
+import file_watch
+import git_dates
+import page_cache
+import profiling
+import remote_snippets
+import shards
+import sinks
+import snippet_capture
+import snippet_files
+import snippet_graph
+import tokens
+import var_usage
+
 MAX_DEPTH = 3
-TOKEN_ESTIMATOR = "heuristic-v1"
+TOKEN_ESTIMATOR = tokens.selected()  # "heuristic-v1" unless GEN_TOKEN_ESTIMATOR says otherwise
 REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Kept in sync with mkdocs.yml `exclude_docs` so the standalone/CI feed matches the
@@ -43,11 +82,16 @@ ATTR_BLOCK_RE = re.compile(r'\{:?\s*' + _ATTR + r'(?:\s+' + _ATTR + r')*\s*\}')
 
 # ----------------------------------------------------------------- preprocessing
 
+FRONT_MATTER_RE = re.compile(r"^---\n(.*?)\n---\n?", re.DOTALL)
+# libyaml's loader when PyYAML was built with it (~8x faster, same results).
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
 def split_front_matter(text):
-    m = re.match(r"^---\n(.*?)\n---\n?", text, re.DOTALL)
+    m = FRONT_MATTER_RE.match(text)
     if m:
         try:
-            fm = yaml.safe_load(m.group(1)) or {}
+            fm = yaml.load(m.group(1), Loader=_YAML_LOADER) or {}
         except Exception:
             fm = {}
         return fm if isinstance(fm, dict) else {}, text[m.end():]
@@ -57,34 +101,87 @@ def split_front_matter(text):
 _SNIPPET_PRE = {}
 
 
+def _track_deps(pre):
+    """Record every snippet lookup the preprocessor makes into `pre.deps` as
+    (parent, path, resolved) — parent is the including snippet (None = the page),
+    resolved is the file/URL read (None = missing, skipped with check_paths off).
+    Wraps instance attributes; parse_snippets recurses via self, so nesting is seen."""
+    pre.deps, stack = [], []
+    get_path, parse = pre.get_snippet_path, pre.parse_snippets
+
+    def get_snippet_path(path):
+        found = get_path(path)
+        pre.deps.append((stack[-1] if stack else None, path, found))
+        return found
+
+    def parse_snippets(lines, file_name=None, is_url=False, is_section=False):
+        if file_name and is_url:
+            pre.deps.append((stack[-1] if stack else None, file_name, file_name))
+        if file_name:
+            stack.append(file_name)
+        try:
+            return parse(lines, file_name, is_url=is_url, is_section=is_section)
+        finally:
+            if file_name:
+                stack.pop()
+
+    pre.get_snippet_path, pre.parse_snippets = get_snippet_path, parse_snippets
+
+
 def _snippet_preprocessor(base, url_download):
     """The real pymdownx.snippets preprocessor, configured to match mkdocs.yml
     (base_path, dedent_subsections). Cached; run() resets its own cycle-detection
-    state each call, so reuse across pages is safe."""
+    state each call, so reuse across pages is safe. Local snippet files are read
+    through the shared in-memory cache (snippet_files.py)."""
     key = (base, url_download)
     if key not in _SNIPPET_PRE:
         import markdown
+        snippet_files.install()
         md = markdown.Markdown(extensions=["pymdownx.snippets"], extension_configs={
             "pymdownx.snippets": {"base_path": [base], "url_download": url_download,
                                   "dedent_subsections": True, "check_paths": False}})
         _SNIPPET_PRE[key] = md.preprocessors["snippet"]
+        _track_deps(_SNIPPET_PRE[key])
+        snippet_capture.own(_SNIPPET_PRE[key])
+        if url_download:
+            remote_snippets.install(on_missing=lambda url, e: print(
+                f"[generate_feed] remote snippet dropped: {e}", file=sys.stderr))
     return _SNIPPET_PRE[key]
 
 
 # Fetch remote (url_download) snippets by default to match the site build; set
 # GEN_SNIPPET_URL_DOWNLOAD=0 (e.g. in CI) to stay fully offline — local snippets still
-# resolve and remote ones are dropped rather than fetched.
+# resolve and remote ones are dropped rather than fetched. Fetches go through the
+# on-disk remote_snippets cache shared with the mkdocs build (GEN_SNIPPET_OFFLINE=1
+# serves a warmed cache without any network).
 _URL_DOWNLOAD = os.environ.get("GEN_SNIPPET_URL_DOWNLOAD", "1") != "0"
 
 
-def resolve_snippets(text, base):
-    # Prefer remote-enabled resolution (matches the build); if a remote snippet is
-    # dead it raises, so retry local-only — that resolves every local snippet and
-    # drops the dead remote cleanly, rather than leaving raw --8<-- directives.
+def resolve_snippets(text, base, deps=None):
+    """Expand --8<-- includes. If `deps` is a list, it receives the lookups made
+    (see _track_deps) for the pass that succeeded; it is set to None if resolution
+    failed and the text was left raw."""
+    # Prefer remote-enabled resolution (matches the build). Dead remotes are dropped
+    # individually by the remote_snippets cache; anything else that raises (e.g. an
+    # oversize payload) retries local-only — that resolves every local snippet and
+    # drops the remotes cleanly, rather than leaving raw --8<-- directives.
+    if "-8<-" not in text:  # every snippet/section marker pymdownx matches contains it
+        return text
+    # Inside an mkdocs build the site render may already have expanded this text.
+    captured = snippet_capture.shared().get(_snippet_preprocessor(base, _URL_DOWNLOAD), text)
+    if captured is not None:
+        if deps is not None:
+            deps.extend(captured[1])
+        return captured[0]
     last = None
     for url_download in ((True, False) if _URL_DOWNLOAD else (False,)):
         try:
-            return "\n".join(_snippet_preprocessor(base, url_download).run(text.split("\n")))
+            pre = _snippet_preprocessor(base, url_download)
+            pre.deps = []
+            out = "\n".join(pre.run(text.split("\n")))
+            if deps is not None:
+                deps.extend(pre.deps)
+            return out
         except ImportError:
             # markdown/pymdownx not installed is a setup error, not a dead snippet —
             # fail loud instead of silently leaving every --8<-- directive raw.
@@ -92,24 +189,52 @@ def resolve_snippets(text, base):
         except Exception as e:
             last = e
     print(f"[generate_feed] snippet resolution failed ({last}); leaving raw", file=sys.stderr)
+    if deps is not None:
+        deps.append(None)
     return text
 
 
-def resolve_vars(text, variables, env):
+def capture_build_snippets():
+    """Record the snippet expansions an mkdocs build makes in this process, for
+    resolve_snippets() to reuse (see snippet_capture.py). Returns the capture."""
+    return snippet_capture.install(_track_deps)
+
+
+def resolve_vars(text, variables, env, usage=None):
+    """Render `text` against variables.yml. Texts without template syntax skip
+    Jinja; the rest reuse one compiled template per distinct content. `usage`,
+    if given, gets the {variable path: template lines} the text reads."""
+    if not var_usage.has_syntax(text):
+        return var_usage.render_plain(text)
     try:
-        return env.from_string(text).render(**variables)
+        template, used = var_usage.compile_template(env, text)
+        if usage is not None:
+            usage.update(used)
+        return template.render(**variables)
     except Exception:
         return text  # forgiving; parity report will flag any drift
 
 
-def clean_body(raw, variables, env, snippet_base):
+def normalize_body(body):
+    """Strip HTML comments, then {..} attr blocks. Most pages have no comments, so
+    that pass (and the copy it makes) is skipped unless one is present."""
+    if "<!--" in body:
+        body = HTML_COMMENT_RE.sub("", body)
+    return ATTR_BLOCK_RE.sub("", body)
+
+
+def clean_body(raw, variables, env, snippet_base, deps=None, usage=None):
     """FM split -> snippets -> {{vars}} -> strip HTML comments -> strip {..} attr blocks."""
-    fm, body = split_front_matter(raw)
-    body = resolve_snippets(body, snippet_base)
-    body = resolve_vars(body, variables, env)
-    body = HTML_COMMENT_RE.sub("", body)
-    body = ATTR_BLOCK_RE.sub("", body)
-    return fm, body
+    with profiling.stage("front_matter", len(raw)):
+        fm, body = split_front_matter(raw)
+    with profiling.stage("snippets", len(body)):
+        body = resolve_snippets(body, snippet_base, deps)
+    with profiling.stage("jinja", len(body)):
+        if usage is not None:  # {"paths": {variable path: lines}, "heads": heading lines}
+            usage["heads"] = _head_lines(body)
+        body = resolve_vars(body, variables, env, None if usage is None else usage["paths"])
+    with profiling.stage("cleanup", len(body)):
+        return fm, normalize_body(body)
 
 # ----------------------------------------------------------------- chunking
 
@@ -130,10 +255,43 @@ def slugify_anchor(text, seen):
 
 
 def estimate_tokens(text):
-    return len(re.findall(r"\w+|[^\s\w]", text, flags=re.UNICODE))
+    return tokens.estimate_tokens(text, TOKEN_ESTIMATOR)
 
 
-def extract_sections(body, max_depth=MAX_DEPTH):
+# FENCE_RE/HEADING_RE over a whole body in one scan. `\s` becomes `[^\S\n]` so no
+# match crosses a line; with "\n" the only line break this finds exactly what the
+# per-line matches over splitlines() find. Anchoring on a literal "\n" (rather
+# than MULTILINE `^`) lets the regex engine skip straight from newline to newline.
+_LINE_BLOCK = r"(?:[^\S\n]*(`{3,}|~{3,})|(#{2,6})[^\S\n]+(.+?)[^\S\n]*#*[^\S\n]*$)"
+_FIRST_BLOCK_RE = re.compile(_LINE_BLOCK, re.M)
+_NEXT_BLOCK_RE = re.compile(r"\n" + _LINE_BLOCK, re.M)
+# Other characters str.splitlines() breaks on; bodies containing any take the
+# line-by-line path so section boundaries stay identical.
+_OTHER_LINE_BREAKS = "\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def _heads_scan(body, max_depth):
+    """[(start_char, depth, title)] of fence-aware ## .. max_depth headings."""
+    heads, fence_char = [], None
+    matches = _NEXT_BLOCK_RE.finditer(body)
+    first = _FIRST_BLOCK_RE.match(body)
+    if first:
+        matches = itertools.chain((first,), matches)
+    for m in matches:
+        fence = m.group(1)
+        if fence:
+            if fence_char is None:
+                fence_char = fence[0]
+            elif fence[0] == fence_char:
+                fence_char = None
+        elif fence_char is None and len(m.group(2)) <= max_depth:
+            start = m.start() if m is first else m.start() + 1
+            heads.append((start, len(m.group(2)), m.group(3).strip()))
+    return heads
+
+
+def _heads_lines(body, max_depth):
+    """_heads_scan's reference implementation: splitlines() + per-line matching."""
     lines = body.splitlines(keepends=True)
     starts = [0]
     for ln in lines[:-1]:
@@ -152,19 +310,217 @@ def extract_sections(body, max_depth=MAX_DEPTH):
             continue
         hm = HEADING_RE.match(ln)
         if hm and 2 <= len(hm.group(1)) <= max_depth:
-            heads.append((i, len(hm.group(1)), hm.group(2).strip()))
-    sections, seen = [], {}
-    for idx, (li, depth, title) in enumerate(heads):
-        start = starts[li]
-        end = starts[heads[idx + 1][0]] if idx + 1 < len(heads) else len(body)
+            heads.append((starts[i], len(hm.group(1)), hm.group(2).strip()))
+    return heads
+
+
+def _heads(body, max_depth):
+    if any(c in body for c in _OTHER_LINE_BREAKS):
+        return _heads_lines(body, max_depth)
+    return _heads_scan(body, max_depth)
+
+
+def extract_sections(body, max_depth=MAX_DEPTH):
+    heads = _heads(body, max_depth)
+    sections, seen, path = [], {}, []
+    for idx, (start, depth, title) in enumerate(heads):
+        end = heads[idx + 1][0] if idx + 1 < len(heads) else len(body)
+        while path and path[-1][0] >= depth:
+            path.pop()
+        path.append((depth, title))
         sections.append({
             "index": idx, "depth": depth, "title": title,
             "anchor": slugify_anchor(title, seen),
+            "heading_path": [t for _, t in path],  # enclosing headings, outermost first
             "start_char": start, "end_char": end,
             "text": body[start:end].strip(),
         })
     return sections
 
+
+# ----------------------------------------------------------------- token budgets
+
+def parse_chunk_budget(value):
+    """"MAX[:MIN]" -> (max_tokens, min_tokens), or None for "" (heading sections
+    as-is). MIN defaults to MAX // 8."""
+    if not value:
+        return None
+    hi, _, lo = value.partition(":")
+    try:
+        budget = (int(hi), int(lo) if lo else int(hi) // 8)
+    except ValueError:
+        raise ValueError(f"bad chunk budget {value!r}; expected MAX[:MIN] token counts") from None
+    if budget[0] <= 0 or not 0 <= budget[1] <= budget[0]:
+        raise ValueError(f"bad chunk budget {value!r}; need 0 <= MIN <= MAX and MAX > 0")
+    return budget
+
+
+# Opt-in: GEN_CHUNK_BUDGET=1024:128 re-cuts heading sections to that token budget.
+CHUNK_BUDGET = parse_chunk_budget(os.environ.get("GEN_CHUNK_BUDGET", ""))
+
+
+def _pieces(body, start, end):
+    """Cut body[start:end] into [(start, end, fenced)] spans at paragraph starts
+    (first line after blank ones) and around fenced blocks, fence-aware like
+    _heads_lines. The spans tile the range; none is whitespace-only."""
+    pieces, cut, pos, fence_char, blank = [], start, start, None, False
+    for ln in body[start:end].splitlines(keepends=True):
+        fm = FENCE_RE.match(ln)
+        if fence_char is not None:
+            pos += len(ln)
+            if fm and fm.group(2)[0] == fence_char:
+                pieces.append((cut, pos, True))
+                cut, fence_char, blank = pos, None, False
+            continue
+        if fm or (blank and ln.strip()):
+            if body[cut:pos].strip():
+                pieces.append((cut, pos, False))
+                cut = pos
+            blank = False
+            if fm:
+                fence_char = fm.group(2)[0]
+        elif not ln.strip():
+            blank = True
+        pos += len(ln)
+    if body[cut:end].strip() or not pieces:
+        pieces.append((cut, end, fence_char is not None))
+    else:
+        pieces[-1] = (pieces[-1][0], end, pieces[-1][2])
+    return pieces
+
+
+def _split_lines(body, start, end, fenced, max_tokens):
+    """An oversize piece -> [(start, end, text)] groups of whole lines under the
+    budget where possible. Fenced blocks are closed and reopened around each group
+    so every part stays valid Markdown (its text then isn't a plain body slice)."""
+    lines, pos = body[start:end].splitlines(keepends=True), start
+    while lines and not lines[0].strip():
+        pos += len(lines.pop(0))
+    while lines and not lines[-1].strip():
+        lines.pop()
+    opener = closer = ""
+    if fenced and len(lines) > 1:
+        fm = FENCE_RE.match(lines[0])
+        opener = lines.pop(0)
+        pos += len(opener)
+        last = FENCE_RE.match(lines[-1])
+        if last and last.group(2)[0] == fm.group(2)[0]:
+            closer = lines.pop()
+        else:  # fence left open to the end of the section
+            closer = fm.group(1) + fm.group(2) + "\n"
+    budget = max_tokens - tokens.text_stats(opener + closer, TOKEN_ESTIMATOR).tokens
+    groups, cur, cur_tokens = [], [], 0
+    for ln in lines:
+        n = tokens.text_stats(ln, TOKEN_ESTIMATOR).tokens
+        if cur and cur_tokens + n > budget:
+            groups.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(ln)
+        cur_tokens += n
+    if cur:
+        groups.append(cur)
+    out = []
+    for i, group in enumerate(groups):
+        inner = "".join(group)
+        s, pos = pos, pos + len(inner)
+        text = opener + inner.rstrip("\n") + "\n" + closer if opener else inner
+        out.append((start if i == 0 else s, end if i == len(groups) - 1 else pos, text.strip()))
+    return out
+
+
+def budget_sections(body, sections, max_tokens, min_tokens):
+    """Re-cut extract_sections() output to a token budget: sections over
+    `max_tokens` are split at paragraph/fence boundaries (then at line boundaries
+    for a single oversize block), and runs of whole sections under `min_tokens`
+    are merged into a neighbour while the result fits. Every part records the
+    section it came from (`section_index`, `sub_index` of `sub_count`) and the
+    `anchors` it covers; `start_char`/`end_char` are body offsets as before."""
+    parts = []
+    for sec in sections:
+        if sec["stats"].tokens <= max_tokens:
+            parts.append(dict(sec, section_index=sec["index"], sub_index=0, sub_count=1,
+                              anchors=[sec["anchor"]]))
+            continue
+        cuts, group, group_tokens = [], None, 0
+        for s, e, fenced in _pieces(body, sec["start_char"], sec["end_char"]):
+            n = tokens.text_stats(body[s:e], TOKEN_ESTIMATOR).tokens
+            if group is not None and group_tokens + n <= max_tokens:
+                group, group_tokens = (group[0], e, None), group_tokens + n
+                continue
+            if group is not None:
+                cuts.append(group)
+            if n > max_tokens:
+                cuts.extend(_split_lines(body, s, e, fenced, max_tokens))
+                group, group_tokens = None, 0
+            else:
+                group, group_tokens = (s, e, None), n
+        if group is not None:
+            cuts.append(group)
+        for i, (s, e, text) in enumerate(cuts):
+            text = body[s:e].strip() if text is None else text
+            parts.append(dict(sec, section_index=sec["index"], sub_index=i, sub_count=len(cuts),
+                              anchors=[sec["anchor"]], start_char=s, end_char=e, text=text,
+                              stats=tokens.text_stats(text, TOKEN_ESTIMATOR)))
+
+    merged = []
+    for part in parts:
+        prev = merged[-1] if merged else None
+        if (prev is not None and prev["sub_count"] == 1 and part["sub_count"] == 1
+                and min(prev["stats"].tokens, part["stats"].tokens) < min_tokens
+                and prev["stats"].tokens + part["stats"].tokens <= max_tokens):
+            prev.update(end_char=part["end_char"], anchors=prev["anchors"] + part["anchors"],
+                        text=body[prev["start_char"]:part["end_char"]].strip(),
+                        stats=prev["stats"] + part["stats"])
+            continue
+        merged.append(part)
+    for i, part in enumerate(merged):
+        part["index"] = i
+    return merged
+
+
+def _head_lines(text):
+    """1-based line numbers of a text's headings, as Jinja numbers template lines."""
+    return [text.count("\n", 0, start) + 1 for start, _, _ in _heads(text, MAX_DEPTH)]
+
+
+def _variable_sections(usage, sections):
+    """{variable path: anchors of the sections reading it}, from the template lines
+    clean_body() recorded. The rendered body must have the same headings as the
+    template for lines to map to sections; when it doesn't (a heading inside an
+    HTML comment, or produced by the template), a path maps to None — every
+    section. Reads in the lead-in map to [] — the page, but no chunk."""
+    heads = usage["heads"]
+    exact = len(heads) == len(sections)
+    out = {}
+    for path, lines in usage["paths"].items():
+        if not exact:
+            out[path] = None
+            continue
+        anchors = set()
+        for line in lines:
+            i = bisect.bisect_right(heads, line) - 1
+            if i >= 0:
+                anchors.add(sections[i]["anchor"])
+        out[path] = sorted(anchors)
+    return out
+
+
+def _sha256(text):
+    return "sha256:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_hash(text):
+    """Hash of a chunk's text, normalised (NFC, LF line ends, no trailing spaces)
+    so that invisible edits don't invalidate per-chunk embedding caches."""
+    if not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    return _sha256("\n".join(line.rstrip() for line in text.splitlines()))
+
+
+def heading_path_hash(page_id, heading_path):
+    """Hash of where a chunk sits: its page and the titles of its enclosing headings."""
+    return _sha256("\x1f".join([page_id, *heading_path]))
+
 # ----------------------------------------------------------------- page metadata
 
 def compute_route(docs_dir, path):
@@ -175,28 +531,9 @@ def compute_route(docs_dir, path):
     return route
 
 
-_GIT_DATES = None
-
-
 def _git_dates():
-    """One `git log` walk over the repo, newest-commit ISO per path — vs one
-    subprocess per file (~30ms x 250 files). Built once, cached."""
-    global _GIT_DATES
-    if _GIT_DATES is None:
-        _GIT_DATES = {}
-        try:
-            out = subprocess.run(
-                ["git", "log", "--name-only", "--diff-filter=ACMR", "--pretty=format:%x00%cI"],
-                capture_output=True, text=True, cwd=REPO_ROOT).stdout
-            ts = None
-            for line in out.splitlines():
-                if line.startswith("\x00"):
-                    ts = line[1:].strip()
-                elif line and ts and line not in _GIT_DATES:
-                    _GIT_DATES[line] = ts
-        except Exception:
-            pass
-    return _GIT_DATES
+    """{repo path: newest commit ISO date}, from the persisted index (git_dates.py)."""
+    return git_dates.load().dates
 
 
 def git_last_updated(path):
@@ -228,7 +565,10 @@ def iter_markdown(docs_dir):
 def chunk_row(source, page_id, page_url, page_title, version_hash, last_updated, sec):
     """The single feed-record shape. Used by build() and hooks/ai_feed.py so the
     deployed and CI-validated feeds share one schema."""
-    return {
+    with profiling.stage("hashing", len(sec["text"])):
+        text_hash = chunk_hash(sec["text"])
+        path_hash = heading_path_hash(page_id, sec["heading_path"])
+    row = {
         "source": source,
         "page_id": page_id,
         "url": f'{page_url}#{sec["anchor"]}',
@@ -239,57 +579,547 @@ def chunk_row(source, page_id, page_url, page_title, version_hash, last_updated,
         "anchor": sec["anchor"],
         "start_char": sec["start_char"],
         "end_char": sec["end_char"],
-        "estimated_token_count": estimate_tokens(sec["text"]),
+        "estimated_token_count": sec["stats"].tokens if "stats" in sec else estimate_tokens(sec["text"]),
         "token_estimator": TOKEN_ESTIMATOR,
         "page_version_hash": version_hash,
         "last_updated": last_updated,
         "text": sec["text"],
+        # Added after the original schema: appended, so positional readers keep working.
+        "chunk_hash": text_hash,
+        "heading_path_hash": path_hash,
     }
+    if "sub_index" in sec:  # budget_sections() output; the default feed has none of these
+        row["chunk_budget"] = list(CHUNK_BUDGET)
+        for k in ("section_index", "sub_index", "sub_count", "anchors"):
+            row[k] = sec[k]
+    return row
+
+
+def _cache_key(raw_bytes, path, docs_dir, snippet_base, docs_base_url, source):
+    # Everything process_page's output depends on other than the snippet files
+    # (validated per entry), the variables it reads (checked on every hit) and
+    # git dates (re-read on every hit).
+    return page_cache.make_key(
+        hashlib.sha256(raw_bytes).hexdigest(), os.path.relpath(path, docs_dir),
+        os.path.abspath(snippet_base), docs_base_url, source, _URL_DOWNLOAD, TOKEN_ESTIMATOR,
+        CHUNK_BUDGET)
+
+
+def _is_url(path):
+    return path.lower().startswith(("http://", "https://"))
+
 
+def _dep_edges(deps, snippet_base):
+    """_track_deps records -> sorted unique [parent, child] edges, parent None for
+    the page itself. Local paths are repo-relative; a missing snippet is recorded
+    at the path it would resolve to, so creating it later shows up as a change.
+    None if resolution failed (dependencies unknown)."""
+    if None in deps:
+        return None
 
-def process_page(path, docs_dir, variables, env, snippet_base, docs_base_url, source):
-    """Resolve one markdown file to its cleaned body + metadata + feed rows."""
-    with open(path, encoding="utf-8") as f:
-        raw = f.read()
-    fm, body = clean_body(raw, variables, env, snippet_base)
+    def norm(p):
+        if p is None or _is_url(p):
+            return p
+        return os.path.relpath(os.path.abspath(p), REPO_ROOT).replace(os.sep, "/")
+
+    edges = {(norm(parent), norm(found if found is not None else os.path.join(snippet_base, path)))
+             for parent, path, found in deps}
+    return sorted(edges, key=lambda e: (e[0] or "", e[1]))
+
+
+def process_page(path, docs_dir, variables, env, snippet_base, docs_base_url, source,
+                 cache=None, raw_bytes=None):
+    """Resolve one markdown file to its cleaned body + metadata + feed rows.
+    `snippets` lists the include edges resolution followed (see _dep_edges).
+    `variables` maps each variables.yml path the page reads to the anchors of the
+    sections reading it (None: not attributable to sections) and `variable_values`
+    to the digest of its value. With a page_cache.PageCache, unchanged pages (same
+    bytes, snippets, values of the variables they read, and generator version) skip
+    resolution entirely; only `last_updated` is refreshed. `raw_bytes` is the
+    file's content if the caller has already read it (the mkdocs hook has)."""
+    if raw_bytes is None:
+        with profiling.stage("read"), open(path, "rb") as f:
+            raw_bytes = f.read()
+    key = None
+    if cache is not None:
+        with profiling.stage("cache", len(raw_bytes)):
+            key = _cache_key(raw_bytes, path, docs_dir, snippet_base, docs_base_url, source)
+            page = cache.get(key, lambda page: all(var_usage.value_digest(variables, p) == d
+                                                   for p, d in page["variable_values"].items()))
+        if page is not None:
+            with profiling.stage("git_dates"):
+                last_updated = git_last_updated(path)
+            if page["last_updated"] != last_updated:
+                page["last_updated"] = last_updated
+                for row in page["chunks"]:
+                    row["last_updated"] = last_updated
+            return page
+    # Text-mode open()'s newline handling: CRLF/CR pages parse like LF ones.
+    raw = raw_bytes.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    deps, usage = [], {"paths": {}, "heads": []}
+    fm, body = clean_body(raw, variables, env, snippet_base, deps, usage)
     route = compute_route(docs_dir, path)
     page_id = route.replace("/", "-").lower()
     title = fm.get("title") or page_id
     page_url = f"{docs_base_url.rstrip('/')}/{route}/"
-    version_hash = "sha256:" + hashlib.sha256(body.encode("utf-8")).hexdigest()
-    last_updated = git_last_updated(path)
-    chunks = [chunk_row(source, page_id, page_url, title, version_hash, last_updated, sec)
-              for sec in extract_sections(body)]
-    return {"fm": fm, "body": body, "route": route, "page_id": page_id, "title": title,
+    with profiling.stage("hashing", len(body)):
+        version_hash = _sha256(body)
+    with profiling.stage("git_dates"):
+        last_updated = git_last_updated(path)
+    with profiling.stage("sections", len(body)):
+        sections = extract_sections(body)
+        used = _variable_sections(usage, sections)
+    # Sections tile the body from the first heading on, cut at line starts, so the
+    # page's word/token totals are the lead-in's plus the sections' — no rescan.
+    with profiling.stage("tokens", len(body)):
+        stats = tokens.text_stats(body[:sections[0]["start_char"]] if sections else body,
+                                  TOKEN_ESTIMATOR)
+        for sec in sections:
+            sec["stats"] = tokens.text_stats(sec["text"], TOKEN_ESTIMATOR)
+            stats += sec["stats"]
+    if CHUNK_BUDGET:
+        with profiling.stage("sections", len(body)):
+            sections = budget_sections(body, sections, *CHUNK_BUDGET)
+    with profiling.stage("rows"):
+        chunks = [chunk_row(source, page_id, page_url, title, version_hash, last_updated, sec)
+                  for sec in sections]
+    page = {"fm": fm, "body": body, "route": route, "page_id": page_id, "title": title,
             "url": page_url, "version_hash": version_hash, "last_updated": last_updated,
-            "chunks": chunks}
+            "word_count": stats.words, "token_estimate": stats.tokens,
+            "chunks": chunks, "snippets": _dep_edges(deps, snippet_base),
+            "variables": used,
+            "variable_values": {p: var_usage.value_digest(variables, p)
+                                for p in usage["paths"]}}
+    # A failed resolution must be retried next run, so isn't cacheable. Remote
+    # includes are validated against the remote_snippets cache's current body.
+    edges = page["snippets"]
+    if key is not None and edges is not None:
+        with profiling.stage("cache"):
+            cache.put(key, page, sorted({c if _is_url(c) else os.path.join(REPO_ROOT, c)
+                                         for _, c in edges}))
+    return page
+
+# ----------------------------------------------------------------- page pipeline
+
+_WORKER = None
+
+
+def _worker_init(docs_dir, vars_path, snippet_base, docs_base_url, source, cache_dir,
+                 profile=None):
+    """Per-process setup for --jobs: load variables, and warm the snippet
+    preprocessor(s) and git-dates index once rather than per page. Also used
+    in-process for the serial path so both share one code path. `profile` is
+    None, or whether to profile with tracemalloc."""
+    global _WORKER
+    if profile is not None:
+        profiling.start(memory=profile)
+    with open(vars_path, encoding="utf-8") as f:
+        variables = yaml.safe_load(f) or {}
+    cache = page_cache.PageCache(cache_dir) if cache_dir else None
+    _WORKER = (docs_dir, variables, Environment(), snippet_base, docs_base_url, source, cache)
+    _git_dates()
+    for url_download in ((True, False) if _URL_DOWNLOAD else (False,)):
+        try:
+            _snippet_preprocessor(snippet_base, url_download)
+        except ImportError:
+            pass  # surfaces (loudly) from resolve_snippets on first use
+
+
+def _worker_page(path):
+    """-> (process_page() dict, (cache hits, cache misses), profiling record) for one page."""
+    docs_dir, variables, env, snippet_base, docs_base_url, source, cache = _WORKER
+    before = (cache.hits, cache.misses) if cache else (0, 0)
+    with profiling.page(snippet_graph.repo_rel(path)):
+        page = process_page(path, docs_dir, variables, env, snippet_base, docs_base_url, source,
+                            cache=cache)
+    after = (cache.hits, cache.misses) if cache else (0, 0)
+    return page, (after[0] - before[0], after[1] - before[1]), profiling.take_page()
+
+
+def _ordered_map(fn, items, jobs, init_args):
+    """fn over items — in-process, or in `jobs` worker processes with a bounded
+    window in flight — yielding results lazily and in input order."""
+    if jobs <= 1 or len(items) <= 1:
+        _worker_init(*init_args)
+        for item in items:
+            yield fn(item)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(min(jobs, len(items)), initializer=_worker_init,
+                             initargs=init_args) as ex:
+        it = iter(items)
+        window = collections.deque(ex.submit(fn, item) for item in itertools.islice(it, jobs * 4))
+        while window:
+            result = window.popleft().result()
+            window.extend(ex.submit(fn, item) for item in itertools.islice(it, 1))
+            yield result
+
+
+def iter_pages(paths, docs_dir, vars_path, snippet_base, docs_base_url, source="polkadot-docs",
+               cache_dir=None, jobs=1, stats=None):
+    """Lazily process_page() each of `paths`, yielding page dicts in order as they
+    become ready — at most a few pages per worker are held in memory. `stats`, if
+    given, accumulates page-cache "hits"/"misses"."""
+    prof = profiling.active()
+    init_args = (docs_dir, vars_path, snippet_base, docs_base_url, source, cache_dir,
+                 None if prof is None else prof.memory)
+    for page, (hits, misses), record in _ordered_map(_worker_page, list(paths), jobs, init_args):
+        profiling.add_page(record)
+        if stats is not None:
+            stats["hits"] = stats.get("hits", 0) + hits
+            stats["misses"] = stats.get("misses", 0) + misses
+        yield page
+
+
+def iter_chunks(pages):
+    """Feed rows of each page from iter_pages(), in feed order."""
+    for page in pages:
+        yield from page["chunks"]
 
 # ----------------------------------------------------------------- main
 
+def feed_paths(docs_dir, cfg):
+    """The markdown files that make up the feed, in feed order."""
+    excl = cfg.get("content", {}).get("exclusions", {})
+    skip_base = set(excl.get("skip_basenames", [])) | DEFAULT_EXCLUDE_BASENAMES
+    skip_paths = excl.get("skip_paths", [])
+    paths = []
+    for path in iter_markdown(docs_dir):
+        rel = os.path.relpath(path, docs_dir)
+        if os.path.basename(path) in skip_base or any(sp in rel.split(os.sep) for sp in skip_paths):
+            continue
+        paths.append(path)
+    return paths
+
+
+def _previous_feed_index(args, graph, fingerprint, index_out=None):
+    """{page_id: (start, end)} byte ranges in the last feed at args.out, if the graph
+    written alongside it still describes it (same generator and settings,
+    same bytes). A page's rows are contiguous, so each is one range. Read from the
+    feed's offset index when it matches too, else by scanning the feed."""
+    if graph is None or graph.fingerprint != fingerprint or not os.path.exists(args.out):
+        return None
+    if snippet_graph.file_sha256(args.out) != graph.feed_sha256:
+        return None
+    try:
+        offsets = feed_index.load_index(index_out) if index_out else None
+    except (OSError, ValueError):
+        offsets = None
+    if offsets is not None and offsets["sha256"] == graph.feed_sha256:
+        return {page_id: (off, off + length) for page_id, (off, length, _) in offsets["pages"].items()}
+    index, pos = {}, 0
+    with open(args.out, "rb") as f:
+        for line in f:
+            page_id = json.loads(line)["page_id"]
+            start = index[page_id][0] if page_id in index else pos
+            pos += len(line)
+            index[page_id] = (start, pos)
+    return index
+
+
+def _subgraph(graph, edges):
+    """snippet -> snippet edges reachable from `edges` in `graph`."""
+    out, todo, seen = [], [c for _, c in edges], set()
+    while todo:
+        node = todo.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        for kid in graph.snippets.get(node, ()):
+            out.append((node, kid))
+            todo.append(kid)
+    return out
+
+
+def _feed_sinks(args, index_out, categories_info):
+    """The sink chain for --out and its sidecars (--tee, offset index, BM25, shards,
+    dedup) -> (sink, the IndexSink or None)."""
+    sink = sinks.open_sink(args.out, *args.tee)
+    feed = sink.sinks[0] if isinstance(sink, sinks.TeeSink) else sink
+    index_sink = None
+    if index_out:
+        index_sink = feed_index.IndexSink(index_out, feed)
+        sink = sinks.TeeSink(sink, index_sink)
+    if args.bm25_out:
+        sink = sinks.TeeSink(sink, bm25.BM25Sink(args.bm25_out))
+    if args.shards_dir:
+        sink = sinks.TeeSink(sink, shards.CategoryShardSink(args.shards_dir, categories_info, feed))
+    if args.dedup or args.dedup_report:  # outermost: every artifact sees the deduplicated rows
+        sink = dedup.DedupSink(sink, args.dedup_report, refs=args.dedup, threshold=args.dedup_threshold)
+    return sink, index_sink
+
+
 def build(args):
+    if args.profile is not None:
+        profiling.start(memory=args.profile_memory)
+    with open(args.config, encoding="utf-8") as f:
+        cfg = json.load(f)
+    with open(args.vars, encoding="utf-8") as f:
+        variables = yaml.safe_load(f) or {}
+    docs_base_url = cfg.get("project", {}).get("docs_base_url", "https://docs.polkadot.com/")
+    categories_info = cfg.get("content", {}).get("categories_info", {})
+    cache_dir = None if args.no_cache or not page_cache.enabled() else args.cache_dir
+    paths = feed_paths(args.docs, cfg)
+    deps_out = args.deps_out or os.path.splitext(args.out)[0] + ".deps.json"
+    # Offsets are into the uncompressed feed, so a gzip --out gets no index.
+    index_out = None if args.out.endswith(".gz") else args.index_out or feed_index.index_path(args.out)
+    fingerprint = page_cache.make_key(docs_base_url, args.source,
+                                      _URL_DOWNLOAD, os.path.relpath(args.snippets, REPO_ROOT),
+                                      TOKEN_ESTIMATOR, CHUNK_BUDGET)
+
+    # --previous: load the last build's chunk digests now — it may be the very
+    # file --out is about to replace.
+    previous = None
+    if args.previous:
+        if index_out is None:
+            raise SystemExit("--previous needs an uncompressed --out (add the .gz with --tee)")
+        previous = feed_index.load(args.previous)
+
+    # --changed-since: reuse the previous feed's rows for every page the dependency
+    # graph says is untouched; anything unknown (new page, stale graph) is reprocessed.
+    old_graph = snippet_graph.SnippetGraph.load(deps_out)
+    reuse = {}
+    if args.changed_since:
+        if args.out.endswith(".gz"):
+            raise SystemExit("--changed-since needs an uncompressed --out (add the .gz with --tee)")
+        if args.dedup:  # reused rows may be references to canonicals that just changed
+            raise SystemExit("--changed-since can't reuse a --dedup feed; drop one of them")
+        prev = _previous_feed_index(args, old_graph, fingerprint, index_out)
+        if prev is None:
+            print(f"--changed-since: no matching previous feed/graph at {args.out}; "
+                  "rebuilding everything", file=sys.stderr)
+        else:
+            dirty = old_graph.affected(snippet_graph.changed_paths(old_graph, args.changed_since),
+                                       remote_volatile=_URL_DOWNLOAD)
+            dirty.update(old_graph.variable_readers(old_graph.changed_variables(variables)))
+            for path in paths:
+                rel = snippet_graph.repo_rel(path)
+                info = old_graph.pages.get(rel)
+                if info and rel not in dirty:  # absent from prev = page had no sections
+                    reuse[path] = (info["page_id"], prev.get(info["page_id"], (0, 0)))
+            print(f"--changed-since {args.changed_since}: reprocessing "
+                  f"{len(paths) - len(reuse)} of {len(paths)} pages")
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    cache_stats = {}
+    shallow = git_dates.shallow_report(git_dates.load())  # also refreshes the index before -j forks
+    if shallow:
+        print(f"warning: {shallow}", file=sys.stderr)
+    fresh = iter_pages([p for p in paths if p not in reuse], args.docs, args.vars,
+                       args.snippets, docs_base_url, args.source, cache_dir, jobs, cache_stats)
+    head, uncommitted = snippet_graph.git_state()
+    graph = snippet_graph.SnippetGraph(fingerprint=fingerprint, head=head, uncommitted=uncommitted)
+    pages = 0
+    # Rows stream straight to the sink(s) as each page is ready; only the small
+    # dependency graph is kept for the whole corpus.
+    sink, index_sink = _feed_sinks(args, index_out, categories_info)
+    with sink, (open(args.out, "rb") if reuse else contextlib.nullcontext()) as prev_f:
+        for path in paths:
+            if path in reuse:  # unchanged page: copy its rows' bytes, carry its subgraph over
+                page_id, (start, end) = reuse[path]
+                old = old_graph.pages[snippet_graph.repo_rel(path)]
+                categories = old.get("categories") or [shards.UNCATEGORIZED]
+                with profiling.page(snippet_graph.repo_rel(path)), profiling.stage("emit"):
+                    sink.begin_page(page_id, categories)
+                    prev_f.seek(start)
+                    lines = prev_f.read(end - start).splitlines(keepends=True)
+                    counts = old.get("tokens") or [None] * len(lines)
+                    for line, n in zip(lines, counts):
+                        sink.write_line(line, n)
+                edges = [(None, c) for c in old["snippets"] or ()]
+                edges += _subgraph(old_graph, edges)
+                used = old.get("variables") or {}
+                values = {p: old_graph.variables[p] for p in used if p in old_graph.variables}
+            else:
+                page = next(fresh)
+                lines, page_id, edges = page["chunks"], page["page_id"], page["snippets"]
+                used, values = page["variables"], page["variable_values"]
+                counts = [row["estimated_token_count"] for row in lines]
+                categories = shards.category_ids(page["fm"].get("categories"), categories_info)
+                with profiling.page(snippet_graph.repo_rel(path)), profiling.stage("emit"):
+                    sink.begin_page(page_id, categories)
+                    for row in lines:
+                        sink.write(row)
+            pages += bool(lines)
+            graph.add_page(path, page_id, edges, categories, used, values, counts)
+        rows = sink.rows
+    print(f"wrote {args.out}: {rows} chunks across {pages} pages")
+    if isinstance(sink, dedup.DedupSink):
+        d = sink.deduper.report()
+        print(f"near-duplicates: {d['duplicates']} chunks in {len(d['clusters'])} clusters, "
+              f"{d['tokens_saved']} tokens" + (" replaced by references" if args.dedup else ""))
+
+    graph.feed_sha256 = snippet_graph.file_sha256(args.out)
+    graph.save(deps_out)
+
+    if previous is not None:
+        delta_out = args.delta_out or os.path.splitext(args.out)[0] + ".delta.jsonl"
+        d = feed_delta.write_delta(delta_out, previous,
+                                   index_sink.index(args.out, graph.feed_sha256), args.out)
+        print(f"wrote {delta_out}: {d['added']} added, {d['changed']} changed, "
+              f"{d['meta']} metadata-only, {d['removed']} removed, {d['unchanged']} unchanged")
+
+    if cache_dir:
+        cache = page_cache.PageCache(cache_dir)
+        print(f"page cache {cache.root}: {cache_stats.get('hits', 0)} hits, "
+              f"{cache_stats.get('misses', 0)} misses, {cache.prune()} evicted")
+
+    if args.profile is not None:
+        profile_out = args.profile or os.path.splitext(args.out)[0] + ".profile.json"
+        p = profiling.stop().write(profile_out, args.profile_top)
+        top = ", ".join(f"{name} {s['seconds']:.2f}s" for name, s in list(p["stages"].items())[:4])
+        print(f"wrote {profile_out}: {p['wall_seconds']:.2f}s wall; {top}")
+    return rows
+
+
+def _old_variables(old, vars_path):
+    """variables.yml as of `old`: a file path, or a git ref to read it at."""
+    if os.path.isfile(old):
+        with open(old, encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    spec = f"{old}:{snippet_graph.repo_rel(vars_path)}"
+    r = subprocess.run(["git", "show", spec], capture_output=True, text=True, cwd=REPO_ROOT)
+    if r.returncode:
+        raise SystemExit(f"--vars-affected {old}: not a file, and git show {spec} failed: "
+                         f"{r.stderr.strip()}")
+    return yaml.safe_load(r.stdout) or {}
+
+
+def vars_affected(args):
+    """Print (as JSON) which pages and chunks of the last build read a variables.yml
+    path whose value differs between args.vars_affected (a file or git ref; empty:
+    the values the build recorded) and args.vars. Nothing is rebuilt."""
+    deps_out = args.deps_out or os.path.splitext(args.out)[0] + ".deps.json"
+    graph = snippet_graph.SnippetGraph.load(deps_out)
+    if graph is None:
+        raise SystemExit(f"--vars-affected: no dependency graph at {deps_out}; build the feed first")
     with open(args.vars, encoding="utf-8") as f:
         variables = yaml.safe_load(f) or {}
-    env = Environment()
+    if args.vars_affected:
+        old = _old_variables(args.vars_affected, args.vars)
+        changed = var_usage.changed_paths(graph.variables, old, variables)
+    else:
+        changed = graph.changed_variables(variables)
+    # Chunk keys come from the feed's offset index when it still matches the graph.
+    index = None
+    if not args.out.endswith(".gz"):
+        try:
+            index = feed_index.load_index(args.index_out or feed_index.index_path(args.out))
+        except (OSError, ValueError):
+            pass
+    if index is not None and index["sha256"] != graph.feed_sha256:
+        index = None
+    pages = []
+    for path, anchors in sorted(graph.variable_readers(changed).items()):
+        info = graph.pages[path]
+        entry = {"path": path, "page_id": info["page_id"],
+                 "variables": sorted(p for p in info["variables"] if p in changed),
+                 "sections": "all" if anchors is None else anchors}
+        if index is not None and info["page_id"] in index["pages"]:
+            start, length, _ = index["pages"][info["page_id"]]
+            entry["chunks"] = [key for key, (off, *_) in index["urls"].items()
+                               if start <= off < start + length and
+                               (anchors is None or key.split("#", 1)[-1].split("~")[0] in anchors)]
+        pages.append(entry)
+    print(json.dumps({"changed": sorted(changed), "pages": pages}, indent=1, ensure_ascii=False))
+
+
+# ----------------------------------------------------------------- watch mode
+
+def _write_resident(args, cfg, paths, pages, lines, fingerprint, index_out, deps_out):
+    """Stream the resident pages' serialised rows to --out and its sidecars, and
+    save the dependency graph. Returns (row count, graph)."""
+    categories_info = cfg.get("content", {}).get("categories_info", {})
+    head, uncommitted = snippet_graph.git_state()
+    graph = snippet_graph.SnippetGraph(fingerprint=fingerprint, head=head, uncommitted=uncommitted)
+    sink, _ = _feed_sinks(args, index_out, categories_info)
+    with sink:
+        for path in paths:
+            page = pages[path]
+            categories = shards.category_ids(page["fm"].get("categories"), categories_info)
+            sink.begin_page(page["page_id"], categories)
+            counts = [row["estimated_token_count"] for row in page["chunks"]]
+            for line, n in zip(lines[path], counts):
+                sink.write_line(line, n)
+            graph.add_page(path, page["page_id"], page["snippets"], categories,
+                           page["variables"], page["variable_values"], counts)
+        rows = sink.rows
+    graph.feed_sha256 = snippet_graph.file_sha256(args.out)
+    graph.save(deps_out)
+    return rows, graph
+
+
+def watch(args):
+    """--watch: build once keeping every processed page, its serialised rows, the
+    dependency graph, variables and git dates in memory; then, on each change
+    under the docs, reprocess only the pages it affects (the page itself, pages
+    including a changed snippet, pages reading a changed variable) and rewrite
+    the feed and its sidecars from memory. Logs one line per rebuild."""
     with open(args.config, encoding="utf-8") as f:
         cfg = json.load(f)
-    excl = cfg.get("content", {}).get("exclusions", {})
-    skip_base = set(excl.get("skip_basenames", [])) | DEFAULT_EXCLUDE_BASENAMES
-    skip_paths = excl.get("skip_paths", [])
     docs_base_url = cfg.get("project", {}).get("docs_base_url", "https://docs.polkadot.com/")
+    cache_dir = None if args.no_cache or not page_cache.enabled() else args.cache_dir
+    deps_out = args.deps_out or os.path.splitext(args.out)[0] + ".deps.json"
+    index_out = None if args.out.endswith(".gz") else args.index_out or feed_index.index_path(args.out)
+    fingerprint = page_cache.make_key(docs_base_url, args.source,
+                                      _URL_DOWNLOAD, os.path.relpath(args.snippets, REPO_ROOT),
+                                      TOKEN_ESTIMATOR, CHUNK_BUDGET)
+    init_args = (args.docs, args.vars, args.snippets, docs_base_url, args.source, cache_dir)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
 
-    rows = []
-    for path in iter_markdown(args.docs):
-        rel = os.path.relpath(path, args.docs)
-        if os.path.basename(path) in skip_base or any(sp in rel.split(os.sep) for sp in skip_paths):
-            continue
-        rows.extend(process_page(path, args.docs, variables, env, args.snippets,
-                                 docs_base_url, args.source)["chunks"])
-    with open(args.out, "w", encoding="utf-8") as f:
-        for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
-    pages = len({r["page_id"] for r in rows})
-    print(f"wrote {args.out}: {len(rows)} chunks across {pages} pages")
-    return rows
+    t = time.perf_counter()
+    paths = feed_paths(args.docs, cfg)
+    pages, lines = {}, {}
+    for path, page in zip(paths, iter_pages(paths, *init_args, jobs)):
+        pages[path] = page
+        lines[path] = [sinks.dumps(row).encode("utf-8") for row in page["chunks"]]
+    _worker_init(*init_args)  # later pages are reprocessed in this process
+    rows, graph = _write_resident(args, cfg, paths, pages, lines, fingerprint, index_out, deps_out)
+
+    config, vars_path = os.path.abspath(args.config), os.path.abspath(args.vars)
+    roots = {(os.path.abspath(args.docs), True), (os.path.abspath(args.snippets), True),
+             (os.path.dirname(vars_path), False), (os.path.dirname(config), False)}
+    watcher = file_watch.Watcher(sorted(roots))
+    print(f"[watch] wrote {args.out}: {rows} chunks across {sum(map(bool, lines.values()))} "
+          f"pages in {(time.perf_counter() - t) * 1e3:.0f} ms; watching {args.docs} "
+          f"({watcher.backend})", flush=True)
+
+    try:
+        for changed in watcher.changes():
+            relevant = {p for p in changed if p in (config, vars_path)
+                        or p.startswith(os.path.abspath(args.snippets) + os.sep)
+                        or p.endswith((".md", ".mdx"))}
+            if not relevant:
+                continue
+            t = time.perf_counter()
+            remote_snippets.shared().clear()  # retry failures, re-apply TTLs per rebuild
+            dirty = set()
+            if config in relevant:  # exclusions may have changed: re-derive the page set
+                with open(config, encoding="utf-8") as f:
+                    cfg = json.load(f)
+            if vars_path in relevant:
+                with open(vars_path, encoding="utf-8") as f:
+                    new_vars = yaml.safe_load(f) or {}
+                dirty |= set(graph.variable_readers(graph.changed_variables(new_vars)))
+                _worker_init(*init_args)  # reloads variables.yml
+            dirty |= graph.affected({snippet_graph.repo_rel(p) for p in relevant})
+            paths = feed_paths(args.docs, cfg)
+            redo = [p for p in paths if p not in pages or snippet_graph.repo_rel(p) in dirty]
+            for path in redo:
+                page = _worker_page(path)[0]
+                pages[path] = page
+                lines[path] = [sinks.dumps(row).encode("utf-8") for row in page["chunks"]]
+            for path in set(pages) - set(paths):  # deleted or newly excluded
+                del pages[path], lines[path]
+            rows, graph = _write_resident(args, cfg, paths, pages, lines, fingerprint, index_out,
+                                          deps_out)
+            names = sorted(snippet_graph.repo_rel(p) for p in relevant)
+            print(f"[watch] {datetime.now().strftime('%H:%M:%S')} {', '.join(names[:3])}"
+                  f"{f' (+{len(names) - 3} more)' if len(names) > 3 else ''}: reprocessed "
+                  f"{len(redo)} of {len(paths)} pages, wrote {rows} chunks in "
+                  f"{(time.perf_counter() - t) * 1e3:.0f} ms", flush=True)
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
@@ -301,6 +1131,69 @@ if __name__ == "__main__":
     ap.add_argument("--snippets", default=os.path.join(root, "docs", ".snippets"))
     ap.add_argument("--config", default=os.path.join(root, "llms_config.json"))
     ap.add_argument("--source", default="polkadot-docs")
-    ap.add_argument("--out", default=os.path.join(here, "llms-full.new.jsonl"))
+    ap.add_argument("--out", default=os.path.join(here, "llms-full.new.jsonl"),
+                    help="feed path (.gz suffix = gzip)")
+    ap.add_argument("--tee", action="append", default=[], metavar="PATH",
+                    help="also stream the feed to PATH (repeatable; .gz suffix = gzip)")
+    ap.add_argument("--index-out", default=None, metavar="PATH",
+                    help="byte-offset index of the feed (default: <out>.index.json; "
+                         "none for a .gz --out)")
+    ap.add_argument("--previous", default=os.environ.get("GEN_FEED_PREVIOUS"), metavar="PATH",
+                    help="last build's feed (or its .index.json) to diff against "
+                         "(env GEN_FEED_PREVIOUS); writes --delta-out")
+    ap.add_argument("--delta-out", default=None, metavar="PATH",
+                    help="delta vs --previous (default: <out>.delta.jsonl)")
+    ap.add_argument("--bm25-out", default=None, metavar="PATH",
+                    help="also write a BM25 inverted index of the chunks (see bm25.py)")
+    ap.add_argument("--dedup-report", default=None, metavar="PATH",
+                    help="write near-duplicate chunk clusters (MinHash) to PATH as JSON")
+    ap.add_argument("--dedup", action="store_true",
+                    help="replace near-duplicate chunks' text with a duplicate_of reference")
+    ap.add_argument("--dedup-threshold", type=float, default=dedup.THRESHOLD,
+                    help="estimated Jaccard similarity that counts as a duplicate")
+    ap.add_argument("--shards-dir", default=None, metavar="DIR",
+                    help="also write per-category shards + manifest.json to DIR")
+    ap.add_argument("--cache-dir", default=page_cache.default_dir(),
+                    help="persistent page cache (env GEN_FEED_CACHE_DIR)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="reprocess every page (or set GEN_FEED_CACHE=0)")
+    ap.add_argument("--jobs", "-j", type=int, default=1,
+                    help="process pages in N worker processes (0 = one per CPU)")
+    ap.add_argument("--deps-out", default=None,
+                    help="page/snippet dependency graph (default: <out>.deps.json)")
+    ap.add_argument("--changed-since", metavar="GIT_REF", default=None,
+                    help="reprocess only pages whose source or (transitive) snippets "
+                         "changed since GIT_REF; reuses the rest from the previous --out")
+    ap.add_argument("--vars-affected", nargs="?", const="", default=None, metavar="OLD",
+                    help="don't build: list the pages/chunks of the last build that read a "
+                         "variable changed since OLD (a variables.yml copy or git ref; "
+                         "default: the values that build used)")
+    ap.add_argument("--profile", nargs="?", const="", default=None, metavar="PATH",
+                    help="write per-stage/per-page timings to PATH (default: <out>.profile.json)")
+    ap.add_argument("--profile-top", type=int, default=profiling.TOP_PAGES, metavar="N",
+                    help="slowest pages listed in the --profile report")
+    ap.add_argument("--profile-memory", action="store_true",
+                    help="add tracemalloc peaks per stage to --profile (slow)")
+    ap.add_argument("--watch", action="store_true",
+                    help="build, then keep pages in memory and update the feed on every "
+                         "save under --docs (Ctrl-C to stop)")
+    ap.add_argument("--chunk-budget", metavar="MAX[:MIN]", default=None,
+                    help="re-cut sections to MAX tokens, merging ones under MIN "
+                         "(default MAX/8); env GEN_CHUNK_BUDGET. Off by default")
     args = ap.parse_args()
+    if args.chunk_budget is not None:
+        # Workers read it from the environment when they import this module.
+        try:
+            CHUNK_BUDGET = parse_chunk_budget(args.chunk_budget)
+        except ValueError as e:
+            ap.error(str(e))
+        os.environ["GEN_CHUNK_BUDGET"] = args.chunk_budget
+    if args.vars_affected is not None:
+        vars_affected(args)
+        sys.exit(0)
+    if args.watch:
+        if args.changed_since or args.previous or args.profile is not None:
+            ap.error("--watch can't be combined with --changed-since, --previous or --profile")
+        watch(args)
+        sys.exit(0)
     build(args)
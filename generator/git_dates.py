@@ -0,0 +1,136 @@
+"""Persisted git last-modified index: repo-relative path -> committer date (ISO) of
+the newest commit that added or modified it, for generate_feed.git_last_updated().
+
+Rather than walking the whole history on every process start (each mkdocs
+build, each --jobs worker), load() keeps the index on disk keyed by HEAD:
+
+  - same HEAD and shallow boundary: the stored index is used as-is (a file load);
+  - HEAD descends from the stored head: only `git log <old head>..HEAD` is walked
+    and merged over it;
+  - anything else (first run, rebase, branch switch, unshallow): one full walk.
+
+Walks are limited to PATHSPECS — the docs' markdown and the snippets — so the
+images and everything outside docs/ are never listed. In a shallow clone every
+file untouched within the fetched depth dates from the boundary commit, i.e.
+the clone depth rather than its last edit; shallow_report() says how many do.
+
+  GEN_GIT_DATES_CACHE=...   index file (default <repo>/.cache/git_dates.json)
+
+  {"schema_version": 1, "head": "<sha>", "shallow": ["<boundary sha>", ...],
+   "pathspecs": [...], "dates": {"docs/a.md": "2026-01-02T03:04:05+00:00", ...}}
+"""
+import json
+import os
+import subprocess
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(REPO_ROOT, ".cache", "git_dates.json")
+SCHEMA = 1
+PATHSPECS = [":(glob)docs/**/*.md", ":(glob)docs/**/*.mdx", "docs/.snippets/"]
+LOG = ["log", "--name-only", "--diff-filter=ACMR", "--pretty=format:%x00%cI"]
+
+_LOADED = None
+
+
+def _git(*argv):
+    return subprocess.run(["git", *argv], capture_output=True, text=True,
+                          cwd=REPO_ROOT, check=True).stdout
+
+
+def _walk(rev):
+    """{path: date} of the newest commit in `rev` touching each PATHSPECS path."""
+    dates, ts = {}, None
+    for line in _git(*LOG, rev, "--", *PATHSPECS).splitlines():
+        if line.startswith("\x00"):
+            ts = line[1:].strip()
+        elif line and ts and line not in dates:
+            dates[line] = ts
+    return dates
+
+
+def _shallow():
+    """Sorted shallow-boundary commits ([] for a complete history)."""
+    if _git("rev-parse", "--is-shallow-repository").strip() != "true":
+        return []
+    path = os.path.join(REPO_ROOT, _git("rev-parse", "--git-path", "shallow").strip())
+    with open(path, encoding="utf-8") as f:
+        return sorted(line.strip() for line in f if line.strip())
+
+
+class GitDates:
+    def __init__(self, dates=None, head=None, shallow=None, how="unavailable"):
+        self.dates = dates or {}
+        self.head = head
+        self.shallow = shallow or []
+        self.how = how  # "cached", "extended (N commits)", "full walk" or "unavailable"
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            d = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if d.get("schema_version") != SCHEMA or d.get("pathspecs") != PATHSPECS:
+        return None
+    return d
+
+
+def _write(path, gd):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"schema_version": SCHEMA, "head": gd.head, "shallow": gd.shallow,
+                       "pathspecs": PATHSPECS, "dates": gd.dates}, f, sort_keys=True)
+        os.replace(tmp, path)  # atomic: concurrent workers never read a torn index
+    except OSError:
+        pass  # a read-only cache dir just means walking again next time
+
+
+def load(path=None):
+    """GitDates for the current checkout, refreshing the index at `path` as needed.
+    Memoized per process. Never raises: outside a git checkout, or if git fails,
+    `dates` is empty and callers fall back to file mtimes."""
+    global _LOADED
+    if _LOADED is not None:
+        return _LOADED
+    path = path or os.environ.get("GEN_GIT_DATES_CACHE") or DEFAULT_PATH
+    try:
+        head = _git("rev-parse", "HEAD").strip()
+        shallow = _shallow()
+        stored = _read(path)
+        if stored and stored["head"] == head and stored["shallow"] == shallow:
+            _LOADED = GitDates(stored["dates"], head, shallow, "cached")
+            return _LOADED
+        if (stored and stored["shallow"] == shallow and subprocess.run(
+                ["git", "merge-base", "--is-ancestor", stored["head"], head],
+                capture_output=True, cwd=REPO_ROOT).returncode == 0):
+            commits = int(_git("rev-list", "--count", f"{stored['head']}..{head}").strip())
+            dates = {**stored["dates"], **_walk(f"{stored['head']}..{head}")}
+            gd = GitDates(dates, head, shallow, f"extended ({commits} commits)")
+        else:
+            gd = GitDates(_walk(head), head, shallow, "full walk")
+    except (OSError, subprocess.CalledProcessError):
+        _LOADED = GitDates()
+        return _LOADED
+    _write(path, gd)
+    _LOADED = gd
+    return gd
+
+
+def shallow_report(gd):
+    """A warning for a shallow clone — how many indexed paths date from the
+    boundary commit(s) rather than their last real edit — else None."""
+    if not gd.shallow:
+        return None
+    try:
+        boundary = set(_git("log", "--no-walk", "--format=%cI", *gd.shallow).split())
+    except (OSError, subprocess.CalledProcessError):
+        boundary = set()
+    stale = sum(1 for ts in gd.dates.values() if ts in boundary)
+    return (f"git history is shallow ({len(gd.shallow)} boundary commit(s)): {stale} of "
+            f"{len(gd.dates)} docs paths date from the clone boundary, not their last edit, "
+            "so their last_updated is wrong — fetch full history (git fetch --unshallow, "
+            "or actions/checkout with fetch-depth: 0)")
@@ -0,0 +1,158 @@
+"""Persistent, content-addressed cache of generate_feed.process_page() results.
+
+Two-level, like ccache's direct mode: the entry key hashes everything known
+*before* resolution (raw page bytes, generator version, page placement), and
+each entry records the snippet files resolution actually pulled in, with their
+sha256. A lookup is a hit only if every recorded dependency still hashes the
+same (missing snippets are recorded too, so one appearing later is a miss;
+remote includes hash the body the remote_snippets cache currently serves) and
+the caller's `valid` check passes — generate_feed re-digests the variables.yml
+values the page read. Entries are pickles under `<root>/<key[:2]>/<key>.pkl`;
+hits bump the file mtime and prune() evicts least-recently-used entries past
+the size caps.
+
+  GEN_FEED_CACHE=0          disable (generator and mkdocs hook)
+  GEN_FEED_CACHE_DIR=...    location (default <repo>/.cache/ai_feed)
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIR = os.path.join(REPO_ROOT, ".cache", "ai_feed")
+CACHE_SCHEMA = 1
+MAX_ENTRIES = 4000      # ~15x today's page count, so several branches stay warm
+MAX_BYTES = 256 << 20
+
+_FILE_HASHES = {}  # (abs_path, mtime_ns, size) -> sha256 hex, per process
+
+
+def enabled():
+    return os.environ.get("GEN_FEED_CACHE", "1") != "0"
+
+
+def default_dir():
+    return os.environ.get("GEN_FEED_CACHE_DIR") or DEFAULT_DIR
+
+
+def file_hash(path):
+    """sha256 of a file's bytes, or None if it doesn't exist. Memoized on
+    (path, mtime, size) so validating many entries doesn't re-read shared snippets."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    k = (path, st.st_mtime_ns, st.st_size)
+    h = _FILE_HASHES.get(k)
+    if h is None:
+        with open(path, "rb") as f:
+            h = _FILE_HASHES[k] = hashlib.sha256(f.read()).hexdigest()
+    return h
+
+
+def dep_hash(dep):
+    """Current hash of a dependency: a repo-relative path or a remote URL."""
+    if dep.lower().startswith(("http://", "https://")):
+        import remote_snippets
+        return remote_snippets.shared().content_hash(dep)
+    return file_hash(os.path.join(REPO_ROOT, dep))
+
+
+def _sources_hash():
+    h = hashlib.sha256(str(CACHE_SCHEMA).encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for n in sorted(os.listdir(here)):
+        if n.endswith(".py"):
+            with open(os.path.join(here, n), "rb") as f:
+                h.update(n.encode() + b"\0" + f.read())
+    try:
+        import pymdownx
+        h.update(pymdownx.__version__.encode())
+    except ImportError:
+        pass
+    return h.hexdigest()[:16]
+
+
+# Any edit to the generator's own sources (or a pymdownx upgrade) invalidates the cache.
+GENERATOR_VERSION = _sources_hash()
+
+
+def make_key(*parts):
+    h = hashlib.sha256(GENERATOR_VERSION.encode())
+    for p in parts:
+        h.update(b"\0" + (p if isinstance(p, bytes) else str(p).encode("utf-8")))
+    return h.hexdigest()
+
+
+class PageCache:
+    def __init__(self, root=None, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.root = os.path.abspath(root or default_dir())
+        self.max_entries, self.max_bytes = max_entries, max_bytes
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".pkl")
+
+    def get(self, key, valid=None):
+        """The cached value for `key`, or None if absent, unreadable, or stale
+        (a snippet changed, or the `valid` predicate rejects the value)."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            self.misses += 1
+            return None
+        deps = entry.get("deps", {})
+        if any(dep_hash(d) != h for d, h in deps.items()) or (valid and not valid(entry["value"])):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # LRU clock for prune()
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["value"]
+
+    def put(self, key, value, dep_paths):
+        """Store `value`, validated on later lookups against the current hashes of
+        `dep_paths` (absolute snippet paths or URLs; missing ones hash as None)."""
+        deps = {}
+        for p in dep_paths:
+            if not p.lower().startswith(("http://", "https://")):
+                p = os.path.relpath(p, REPO_ROOT).replace(os.sep, "/")
+            deps[p] = dep_hash(p)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump({"deps": deps, "value": value}, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)  # atomic: concurrent builds never read a torn entry
+        except OSError:
+            pass  # a read-only/full cache dir degrades to uncached, never fails the build
+
+    def prune(self):
+        """Evict least-recently-used entries until under both caps. Returns #evicted."""
+        entries = []
+        try:
+            for shard in os.scandir(self.root):
+                if shard.is_dir():
+                    for e in os.scandir(shard.path):
+                        if e.name.endswith(".pkl"):
+                            st = e.stat()
+                            entries.append((st.st_mtime, st.st_size, e.path))
+        except OSError:
+            return 0
+        entries.sort(reverse=True)  # newest first
+        total, evicted = 0, 0
+        for i, (_, size, path) in enumerate(entries):
+            total += size
+            if i >= self.max_entries or total > self.max_bytes:
+                try:
+                    os.remove(path)
+                    evicted += 1
+                except OSError:
+                    pass
+        return evicted
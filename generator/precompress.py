@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Precompressed .gz (and .br) siblings of a built site's text artifacts.
+
+Static hosts that serve `<file>.gz` / `<file>.br` next to `<file>` when the
+client accepts it (nginx gzip_static/brotli_static, Caddy precompressed, ...)
+spend no CPU per request. compress_site() walks the site on a thread pool
+(zlib and brotli release the GIL) and gives every compressible file (HTML, CSS,
+JS, the feed and its sidecars, per-page .md, llms.txt, ...) of at least
+GEN_PRECOMPRESS_MIN bytes its siblings. .br is written only when the `brotli`
+module is installed. A sibling that would not be smaller than its source is not
+written, and a stale one is removed.
+
+Compression is deterministic (gzip mtime 0), and results are cached by the
+source's sha256 under <repo>/.cache/precompressed, so a rebuild only
+compresses files whose bytes changed. The rest are copied from the cache, and
+siblings already holding the right bytes are left untouched (write_if_changed).
+
+  python precompress.py site/            # after any build; hooks/precompress_site.py calls it
+
+  GEN_PRECOMPRESS=0                disable (mkdocs hook; it also skips `mkdocs serve`)
+  GEN_PRECOMPRESS_MIN=1024         smallest file compressed, in bytes
+  GEN_PRECOMPRESS_THREADS=8        pool size (1 compresses inline)
+  GEN_PRECOMPRESS_CACHE_DIR=...    cache location ("" disables the cache)
+"""
+import gzip
+import hashlib
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from artifact_writer import write_if_changed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIR = os.path.join(REPO_ROOT, ".cache", "precompressed")
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_THREADS = 8
+MAX_BYTES = 256 << 20
+GZIP_LEVEL, BROTLI_QUALITY = 9, 11
+COMPRESSIBLE = {".html", ".htm", ".css", ".js", ".mjs", ".map", ".json", ".jsonl", ".md",
+                ".txt", ".xml", ".svg", ".yml", ".yaml", ".csv"}
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def enabled():
+    return os.environ.get("GEN_PRECOMPRESS", "1") != "0"
+
+
+def encodings():
+    """[(suffix, compress(bytes) -> bytes)] available in this environment."""
+    out = [(".gz", lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0))]
+    if brotli is not None:
+        out.append((".br", lambda data: brotli.compress(data, quality=BROTLI_QUALITY)))
+    return out
+
+
+class Precompressor:
+    def __init__(self, cache_dir=None, min_size=None, threads=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get("GEN_PRECOMPRESS_CACHE_DIR", DEFAULT_DIR)
+        self.cache_dir = os.path.abspath(cache_dir) if cache_dir else None
+        self.min_size = _env_int("GEN_PRECOMPRESS_MIN", DEFAULT_MIN_SIZE) if min_size is None else min_size
+        self.threads = max(1, _env_int("GEN_PRECOMPRESS_THREADS", DEFAULT_THREADS)
+                           if threads is None else threads)
+        self.encodings = encodings()
+
+    def _cached(self, digest, suffix, data, compress):
+        """Compressed `data`, from the cache when its digest was compressed before.
+        Returns (bytes, reused)."""
+        if self.cache_dir is None:
+            return compress(data), False
+        path = os.path.join(self.cache_dir, digest[:2], digest + suffix)
+        try:
+            with open(path, "rb") as f:
+                out = f.read()
+            os.utime(path)  # LRU clock for prune()
+            return out, True
+        except OSError:
+            pass
+        out = compress(data)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(out)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # a read-only/full cache dir only costs the reuse
+        return out, False
+
+    def _file(self, path):
+        """Write (or drop) `path`'s siblings. Returns (compressed, reused, written,
+        source bytes, compressed bytes) for the stats."""
+        stats = [0, 0, 0, 0, 0]
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        stats[3] = len(data)
+        for suffix, compress in self.encodings:
+            out, reused = self._cached(digest, suffix, data, compress)
+            stats[1 if reused else 0] += 1
+            if len(out) >= len(data):
+                try:
+                    os.remove(path + suffix)
+                except OSError:
+                    pass
+                continue
+            stats[2] += write_if_changed(path + suffix, out)
+            stats[4] += len(out)
+        return stats
+
+    def candidates(self, site_dir):
+        out = []
+        for root, _, names in os.walk(site_dir):
+            for n in names:
+                if os.path.splitext(n)[1].lower() not in COMPRESSIBLE:
+                    continue
+                p = os.path.join(root, n)
+                try:
+                    if os.path.getsize(p) >= self.min_size:
+                        out.append(p)
+                except OSError:
+                    pass
+        return sorted(out)
+
+    def compress_site(self, site_dir):
+        """Give every candidate under `site_dir` its siblings. Returns stats:
+        files, compressed, reused, written, bytes_in, bytes_out."""
+        paths = self.candidates(site_dir)
+        if self.threads > 1 and len(paths) > 1:
+            with ThreadPoolExecutor(self.threads) as pool:
+                results = list(pool.map(self._file, paths))
+        else:
+            results = [self._file(p) for p in paths]
+        totals = [sum(col) for col in zip(*results)] or [0] * 5
+        return dict(zip(("compressed", "reused", "written", "bytes_in", "bytes_out"), totals),
+                    files=len(paths))
+
+    def prune(self, max_bytes=MAX_BYTES):
+        """Evict least-recently-used cache entries past `max_bytes`. Returns #evicted."""
+        if self.cache_dir is None:
+            return 0
+        entries = []
+        try:
+            for shard in os.scandir(self.cache_dir):
+                if shard.is_dir():
+                    for e in os.scandir(shard.path):
+                        if not e.name.endswith(".tmp"):
+                            st = e.stat()
+                            entries.append((st.st_mtime, st.st_size, e.path))
+        except OSError:
+            return 0
+        entries.sort(reverse=True)  # newest first
+        total, evicted = 0, 0
+        for _, size, path in entries:
+            total += size
+            if total > max_bytes:
+                try:
+                    os.remove(path)
+                    evicted += 1
+                except OSError:
+                    pass
+        return evicted
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("site", help="a built site directory")
+    ap.add_argument("--min-size", type=int, default=None)
+    ap.add_argument("--threads", type=int, default=None)
+    args = ap.parse_args()
+    pre = Precompressor(min_size=args.min_size, threads=args.threads)
+    s = pre.compress_site(args.site)
+    print(f"{s['files']} files ({'+'.join(sfx for sfx, _ in pre.encodings)}): "
+          f"{s['compressed']} compressed, {s['reused']} reused, {s['written']} siblings written; "
+          f"{s['bytes_in'] / 1e6:.1f} MB -> {s['bytes_out'] / 1e6:.1f} MB")
+    pre.prune()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Opt-in per-stage profile of the feed pipeline: generate_feed.py --profile, or
+GEN_FEED_PROFILE=<report.json> for the mkdocs hook.
+
+The pipeline's steps are wrapped in `with profiling.stage(name, nbytes):`. With
+no profiler started that is one global check and a shared no-op context, so
+normal builds pay nothing measurable. A started Profiler records per stage the
+wall time (self time: a nested stage's time is charged to it, not its parent),
+call count and bytes processed, both overall and per page (profiling.page()),
+and with tracemalloc the peak traced memory above the stage's entry level.
+
+Stages: read, cache, front_matter, snippets, jinja, cleanup, sections, tokens,
+hashing, git_dates, rows (chunk_row() proper), json (row serialisation) and
+emit (every sink but the serialisation: index, BM25, shards, dedup, .md files).
+Worker processes (--jobs) profile their own pages and hand the per-page records
+back with each result (take_page() / add_page()).
+
+  {"schema_version": 1, "wall_seconds": …, "pages": …, "tracemalloc": false,
+   "stages": {"jinja": {"calls": …, "seconds": …, "bytes": …, "peak_bytes": …}, …},
+   "slowest_pages": [{"page": "docs/a.md", "seconds": …, "stages": {"jinja": …}}, …]}
+
+  GEN_FEED_PROFILE=path         mkdocs hook: write the report to `path`
+  GEN_FEED_PROFILE_MEMORY=1     … with tracemalloc peaks (much slower)
+"""
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+PROFILE_SCHEMA = 1
+TOP_PAGES = 20
+
+_ACTIVE = None
+_NULL = contextlib.nullcontext()
+
+
+def _add(stats, name, calls, seconds, nbytes, peak):
+    s = stats.get(name)
+    if s is None:
+        s = stats[name] = [0, 0.0, 0, 0]
+    s[0] += calls
+    s[1] += seconds
+    s[2] += nbytes
+    s[3] = max(s[3], peak)
+
+
+class Profiler:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.started = time.perf_counter()
+        self.other = {}   # stage stats outside any page: name -> [calls, seconds, bytes, peak]
+        self.pages = []   # {"page", "seconds", "stages"}
+        self._page = None
+        self._stack = []  # [name, start, child seconds, base memory, peak memory]
+        self._tracing = memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, nbytes=0):
+        frame = [name, time.perf_counter(), 0.0, 0, 0]
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][4] = max(self._stack[-1][4], peak)
+            frame[3] = frame[4] = current
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            peak = 0
+            if self.memory:
+                frame[4] = max(frame[4], tracemalloc.get_traced_memory()[1])
+                peak = frame[4] - frame[3]
+                tracemalloc.reset_peak()
+            if self._stack:
+                parent = self._stack[-1]
+                parent[2] += elapsed
+                parent[4] = max(parent[4], frame[4])
+            stats = self._page["stages"] if self._page is not None else self.other
+            _add(stats, name, 1, elapsed - frame[2], nbytes, peak)
+
+    @contextlib.contextmanager
+    def page(self, name):
+        """Charge the stages inside to page `name`; re-entering the page that just
+        finished (e.g. to emit its rows) adds to the same record."""
+        if self.pages and self.pages[-1]["page"] == name:
+            record = self.pages.pop()
+        else:
+            record = {"page": name, "seconds": 0.0, "stages": {}}
+        outer, self._page = self._page, record
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["seconds"] += time.perf_counter() - start
+            self.pages.append(record)
+            self._page = outer
+
+    def report(self, top=TOP_PAGES):
+        stages = {}
+        for stats in [self.other] + [p["stages"] for p in self.pages]:
+            for name, s in stats.items():
+                _add(stages, name, *s)
+        slowest = sorted(self.pages, key=lambda p: -p["seconds"])[:top]
+        return {"schema_version": PROFILE_SCHEMA,
+                "wall_seconds": round(time.perf_counter() - self.started, 6),
+                "pages": len(self.pages), "tracemalloc": self.memory,
+                "stages": {name: {"calls": c, "seconds": round(t, 6), "bytes": b, "peak_bytes": m}
+                           for name, (c, t, b, m) in sorted(stages.items(), key=lambda kv: -kv[1][1])},
+                "slowest_pages": [{"page": p["page"], "seconds": round(p["seconds"], 6),
+                                   "stages": {n: round(s[1], 6) for n, s in
+                                              sorted(p["stages"].items(), key=lambda kv: -kv[1][1])}}
+                                  for p in slowest]}
+
+    def write(self, path, top=TOP_PAGES):
+        report = self.report(top)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+            f.write("\n")
+        os.replace(path + ".tmp", path)
+        return report
+
+
+def start(memory=False):
+    """Start profiling this process (no-op if already started); returns the Profiler."""
+    global _ACTIVE
+    if _ACTIVE is None:
+        _ACTIVE = Profiler(memory)
+    return _ACTIVE
+
+
+def active():
+    return _ACTIVE
+
+
+def stop():
+    """Stop profiling; returns the Profiler that was active (or None)."""
+    global _ACTIVE
+    prof, _ACTIVE = _ACTIVE, None
+    if prof is not None and prof._tracing:
+        tracemalloc.stop()
+    return prof
+
+
+def stage(name, nbytes=0):
+    return _NULL if _ACTIVE is None else _ACTIVE.stage(name, nbytes)
+
+
+def page(name):
+    return _NULL if _ACTIVE is None else _ACTIVE.page(name)
+
+
+def take_page():
+    """Detach the last finished page's record (to ship it from a worker process)."""
+    return _ACTIVE.pages.pop() if _ACTIVE is not None and _ACTIVE.pages else None
+
+
+def add_page(record):
+    if _ACTIVE is not None and record is not None:
+        _ACTIVE.pages.append(record)
@@ -0,0 +1,256 @@
+"""Persistent on-disk cache for remote (`--8<-- "https://..."`) snippet includes.
+
+install() swaps pymdownx.snippets' per-process lru_cache'd `download` for one
+backed by this cache, so the mkdocs build (hooks/ai_feed.py installs it in
+on_config) and generate_feed.py share a single copy of every remote body:
+
+  - fresh entries (younger than the TTL) are served without touching the network;
+  - stale ones are revalidated with If-None-Match / If-Modified-Since (a 304 just
+    refreshes the timestamp), and served as-is if the network is unreachable;
+  - 404/410 responses are remembered as dead for a (shorter) negative TTL and
+    raise SnippetMissingError, which pymdownx turns into "drop this include" —
+    so one dead URL no longer sends the generator into a second, local-only pass.
+  - install(strict=True) (the mkdocs hook) raises RemoteSnippetError instead,
+    for a dead URL and for an unreachable one with nothing cached, so the site
+    build fails as it did with pymdownx's own download() rather than deploying
+    pages with the include silently dropped.
+
+  GEN_SNIPPET_CACHE_DIR=...    location (default <repo>/.cache/remote_snippets)
+  GEN_SNIPPET_TTL=86400        seconds before a cached body is revalidated
+  GEN_SNIPPET_DEAD_TTL=3600    seconds a dead URL is remembered
+
+Those defaults suit the local generate_feed.py loop. The mkdocs hook installs
+with both at 0, so a site build revalidates every remote once (a conditional
+GET, so usually a 304) and never publishes a day-old body, and a fixed URL
+stops failing the next build; the env vars still override it.
+  GEN_SNIPPET_OFFLINE=1        never touch the network; serve whatever is cached
+  GEN_SNIPPET_ALLOW_MISSING=1  strict installs drop missing includes too (offline previews)
+
+Entries are `<sha256(url)>.json` (metadata) + `<sha256(url)>.body` (raw bytes).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIR = os.path.join(REPO_ROOT, ".cache", "remote_snippets")
+DEAD_STATUSES = {404, 410}
+DEFAULT_TTL, DEFAULT_DEAD_TTL = 86400, 3600
+
+
+class RemoteSnippetError(Exception):
+    """A remote include that can't be served, under a strict install()."""
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def body_lines(content, encoding="utf-8"):
+    """Split a downloaded body exactly as pymdownx.snippets' download() does."""
+    if not content:
+        return [""]
+    last = content.endswith((b"\r", b"\n"))
+    lines = [ln.decode(encoding) for ln in content.splitlines()]
+    if last:
+        lines.append("")
+    return lines
+
+
+class RemoteSnippetCache:
+    def __init__(self, root=None, ttl=None, dead_ttl=None, offline=None):
+        self.root = os.path.abspath(root or os.environ.get("GEN_SNIPPET_CACHE_DIR") or DEFAULT_DIR)
+        self.ttl = _env_int("GEN_SNIPPET_TTL", DEFAULT_TTL) if ttl is None else ttl
+        self.dead_ttl = (_env_int("GEN_SNIPPET_DEAD_TTL", DEFAULT_DEAD_TTL)
+                         if dead_ttl is None else dead_ttl)
+        self.offline = (os.environ.get("GEN_SNIPPET_OFFLINE", "0") != "0"
+                        if offline is None else offline)
+        self.on_missing = None  # callback(url, exc), once per URL per build
+        self.strict = False  # raise RemoteSnippetError, not SnippetMissingError
+        self._mem = {}  # url -> bytes | exception, for one build (see clear())
+        self.stats = {"fresh": 0, "revalidated": 0, "fetched": 0, "stale": 0, "dead": 0}
+
+    def _paths(self, url):
+        key = os.path.join(self.root, hashlib.sha256(url.encode("utf-8")).hexdigest())
+        return key + ".json", key + ".body"
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            body = None
+            if meta.get("status") == "ok":
+                with open(body_path, "rb") as f:
+                    body = f.read()
+            return meta, body
+        except (OSError, ValueError):
+            return None, None
+
+    def _store(self, url, meta, body=None):
+        meta_path, body_path = self._paths(url)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            for path, data in ((body_path, body), (meta_path, json.dumps(meta).encode("utf-8"))):
+                if data is None:
+                    continue
+                fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)  # body first, then meta: readers never see a torn pair
+        except OSError:
+            pass
+
+    def get(self, url, timeout=10.0, headers=None, max_size=0):
+        """Raw body bytes for `url`. Raises SnippetMissingError for a dead or
+        unreachable-and-uncached URL."""
+        if url in self._mem:
+            hit = self._mem[url]
+            if isinstance(hit, Exception):
+                raise hit
+            return hit
+        try:
+            body = self._get(url, timeout, headers or {}, max_size)
+        except Exception as e:
+            self._mem[url] = e
+            if self.on_missing is not None:
+                self.on_missing(url, e)
+            raise
+        self._mem[url] = body
+        return body
+
+    def _get(self, url, timeout, headers, max_size):
+        from pymdownx.snippets import SnippetMissingError
+
+        now = time.time()
+        meta, body = self._load(url)
+        if meta is not None:
+            age = now - meta.get("checked", 0)
+            if meta["status"] == "dead" and (self.offline or age < self.dead_ttl):
+                self.stats["dead"] += 1
+                raise SnippetMissingError(f"Cannot download snippet '{url}' (cached {meta.get('code')})")
+            if meta["status"] == "ok" and body is not None and (self.offline or age < self.ttl):
+                self.stats["fresh"] += 1
+                return body
+        if self.offline:
+            raise SnippetMissingError(f"Cannot download snippet '{url}' (offline, not cached)")
+
+        req_headers = dict(headers)
+        if meta is not None and meta["status"] == "ok" and body is not None:
+            if meta.get("etag"):
+                req_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                req_headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            req = urllib.request.Request(url, headers=req_headers)
+            with urllib.request.urlopen(req, timeout=None if timeout == 0 else timeout) as resp:
+                length = resp.headers.get("content-length")
+                if max_size and length is not None and int(length) >= max_size:
+                    raise ValueError(f"refusing to read payloads larger than or equal to {max_size}")
+                content = resp.read(max_size) if max_size else resp.read()
+                if max_size and len(content) >= max_size:
+                    raise ValueError(f"refusing to read payloads larger than or equal to {max_size}")
+                new_meta = {"url": url, "status": "ok", "checked": now,
+                            "etag": resp.headers.get("ETag"),
+                            "last_modified": resp.headers.get("Last-Modified"),
+                            "sha256": hashlib.sha256(content).hexdigest()}
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and body is not None:
+                meta["checked"] = now
+                self._store(url, meta)
+                self.stats["revalidated"] += 1
+                return body
+            if e.code in DEAD_STATUSES:
+                self._store(url, {"url": url, "status": "dead", "code": e.code, "checked": now})
+                self.stats["dead"] += 1
+                raise SnippetMissingError(f"Cannot download snippet '{url}' ({e.code})") from e
+            return self._stale(url, body, e)
+        except (urllib.error.URLError, OSError) as e:
+            return self._stale(url, body, e)
+        self._store(url, new_meta, content)
+        self.stats["fetched"] += 1
+        return content
+
+    def _stale(self, url, body, err):
+        # Transient failure (DNS, timeout, 5xx): a stale copy beats no copy; without
+        # one, report missing but don't persist — the next run retries.
+        from pymdownx.snippets import SnippetMissingError
+
+        if body is not None:
+            self.stats["stale"] += 1
+            return body
+        raise SnippetMissingError(f"Cannot download snippet '{url}' ({err})") from err
+
+    def clear(self):
+        """Forget what this process looked up, failures included, so the next
+        lookups apply the TTLs (and retry the network) again. Once per build."""
+        self._mem.clear()
+
+    def content_hash(self, url):
+        """sha256 of the current body for `url` (per the TTL rules), or None if dead."""
+        try:
+            return hashlib.sha256(self.get(url)).hexdigest()
+        except Exception:
+            return None
+
+
+_CACHE = None
+
+
+def shared():
+    """The process-wide cache install() wires into pymdownx."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = RemoteSnippetCache()
+    return _CACHE
+
+
+def install(on_missing=None, strict=None, ttl=None, dead_ttl=None):
+    """Route every pymdownx.snippets download in this process through shared().
+    Idempotent, and clears the in-memory lookups, so call it once per build (the
+    mkdocs hook does, from on_config). `on_missing(url, exc)` is told about each URL that gets dropped.
+    With `strict` (unless GEN_SNIPPET_ALLOW_MISSING=1) a dead or unreachable,
+    uncached URL raises RemoteSnippetError, which fails the render, instead of
+    being dropped; None keeps the current setting. `ttl`/`dead_ttl` replace the
+    cache's defaults (GEN_SNIPPET_TTL/GEN_SNIPPET_DEAD_TTL still win when set).
+    Returns the cache."""
+    from pymdownx import snippets
+
+    cache = shared()
+    cache.clear()
+    if on_missing is not None:
+        cache.on_missing = on_missing
+    if ttl is not None:
+        cache.ttl = _env_int("GEN_SNIPPET_TTL", ttl)
+    if dead_ttl is not None:
+        cache.dead_ttl = _env_int("GEN_SNIPPET_DEAD_TTL", dead_ttl)
+    if strict is not None:
+        cache.strict = strict and os.environ.get("GEN_SNIPPET_ALLOW_MISSING", "0") == "0"
+    if getattr(snippets.SnippetPreprocessor.download, "remote_snippet_cache", None) is cache:
+        return cache
+
+    def download(self, url):
+        try:
+            content = cache.get(url, timeout=self.url_timeout, headers=self.url_request_headers,
+                                max_size=self.url_max_size)
+        except snippets.SnippetMissingError as e:
+            if cache.strict:
+                raise RemoteSnippetError(str(e)) from e
+            raise
+        return body_lines(content, self.encoding)
+
+    # The stock method is lru_cache'd and __init__/reset() call .cache_clear() on it;
+    # bound methods forward attribute lookups to the function, so keep that working.
+    # mkdocs builds a preprocessor per page, so clearing there would refetch every
+    # include per page; the memo is reset per build by install() instead.
+    download.cache_clear = lambda: None
+    download.remote_snippet_cache = cache
+    snippets.SnippetPreprocessor.download = download
+    return cache
@@ -0,0 +1,139 @@
+"""Per-category feed shards + manifest, written alongside llms-full.jsonl.
+
+CategoryShardSink is a sinks-style sink (tee it with the main feed sink) that
+routes each page's rows to `<dir>/<category_id>.jsonl` for every category the
+page lists in its front matter — so a page in "Smart Contracts, Tooling" lands
+in both shards, and pages without categories go to `uncategorized.jsonl`.
+Category names map to ids via llms_config.json `content.categories_info`;
+unknown names get a slug id. On close it writes `<dir>/manifest.json`:
+
+  {"schema_version": 1,
+   "feed": {"path": "../llms-full.jsonl", "chunks": …, "tokens": …, "bytes": …, "sha256": …},
+   "shards": [{"id": "smart_contracts", "name": "Smart Contracts",
+               "path": "smart_contracts.jsonl", "pages": …, "chunks": …,
+               "tokens": …, "bytes": …, "sha256": …}, …]}
+
+Shards and the manifest are only rewritten when their bytes change.
+Shards follow categories_info order, then any extra ids alphabetically. Shard
+files the previous manifest.json listed whose categories no longer have pages
+are removed; nothing else in `<dir>` is touched, so it may hold the feed or
+unrelated files. Token totals come from the counts writers pass with each row
+(write_line's `tokens`).
+"""
+import json
+import os
+import re
+
+from artifact_writer import write_if_changed
+from sinks import JsonlSink, dumps
+
+MANIFEST_SCHEMA = 1
+UNCATEGORIZED = "uncategorized"
+
+
+def category_ids(value, categories_info):
+    """Front-matter `categories` ("A, B" or a list) -> category ids."""
+    if not value:
+        return [UNCATEGORIZED]
+    names = value.split(",") if isinstance(value, str) else value
+    by_name = {info.get("name", cid).lower(): cid for cid, info in categories_info.items()}
+    ids = []
+    for name in names:
+        name = str(name).strip()
+        if not name:
+            continue
+        cid = by_name.get(name.lower()) or re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+        if cid and cid not in ids:
+            ids.append(cid)
+    return ids or [UNCATEGORIZED]
+
+
+class CategoryShardSink:
+    def __init__(self, out_dir, categories_info, feed=None):
+        """`feed`, the main feed sink, is summarised in the manifest too — tee it
+        ahead of this sink so it has closed (and has final numbers) first."""
+        self.out_dir = out_dir
+        self.info = categories_info
+        self.feed = feed
+        self.rows = 0
+        self.shards = {}   # id -> JsonlSink
+        self._tokens = {}   # id -> token total
+        self._pages = {}    # id -> page count
+        self._feed_tokens = 0
+        self._current, self._uncounted = [UNCATEGORIZED], set()
+        os.makedirs(out_dir, exist_ok=True)
+        self._previous = self._previous_shards()
+
+    def _previous_shards(self):
+        """Shard file names the last manifest in out_dir listed (this sink's own)."""
+        try:
+            with open(os.path.join(self.out_dir, "manifest.json"), encoding="utf-8") as f:
+                shards = json.load(f).get("shards") or []
+        except (OSError, ValueError, AttributeError):
+            return set()
+        return {s["path"] for s in shards if isinstance(s, dict)
+                and isinstance(s.get("path"), str) and s["path"].endswith(".jsonl")
+                and os.path.basename(s["path"]) == s["path"]}
+
+    def begin_page(self, page_id, categories):
+        self._current = categories or [UNCATEGORIZED]
+        self._uncounted = set(self._current)  # a page counts once it has a row
+
+    def write(self, row):
+        self.write_line(dumps(row).encode("utf-8"), row.get("estimated_token_count"))
+
+    def write_line(self, data, tokens=None):
+        if tokens is None:  # bytes from a feed whose counts weren't recorded
+            tokens = json.loads(data).get("estimated_token_count")
+        tokens = tokens or 0
+        self.rows += 1
+        self._feed_tokens += tokens
+        for cid in self._current:
+            if cid not in self.shards:
+                self.shards[cid] = JsonlSink(os.path.join(self.out_dir, cid + ".jsonl"),
+                                             keep_unchanged=True)
+                self._tokens[cid] = 0
+            self.shards[cid].write_line(data, tokens)
+            self._tokens[cid] += tokens
+            if cid in self._uncounted:
+                self._uncounted.discard(cid)
+                self._pages[cid] = self._pages.get(cid, 0) + 1
+
+    def _order(self):
+        known = [cid for cid in self.info if cid in self.shards]
+        return known + sorted(cid for cid in self.shards if cid not in self.info)
+
+    def close(self, commit=True):
+        for shard in self.shards.values():
+            shard.close(commit)
+        if not commit:
+            return
+        keep = {cid + ".jsonl" for cid in self.shards}
+        feed = os.path.abspath(self.feed.path) if self.feed is not None else None
+        for name in sorted(self._previous - keep):
+            path = os.path.join(self.out_dir, name)
+            if os.path.abspath(path) != feed:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        manifest = {"schema_version": MANIFEST_SCHEMA}
+        if self.feed is not None:
+            manifest["feed"] = {
+                "path": os.path.relpath(self.feed.path, self.out_dir).replace(os.sep, "/"),
+                "chunks": self.feed.rows, "tokens": self._feed_tokens,
+                "bytes": self.feed.bytes, "sha256": self.feed.sha256.hexdigest()}
+        manifest["shards"] = [{
+            "id": cid, "name": self.info.get(cid, {}).get("name", cid),
+            "path": cid + ".jsonl", "pages": self._pages.get(cid, 0),
+            "chunks": self.shards[cid].rows, "tokens": self._tokens[cid],
+            "bytes": self.shards[cid].bytes, "sha256": self.shards[cid].sha256.hexdigest(),
+        } for cid in self._order()]
+        write_if_changed(os.path.join(self.out_dir, "manifest.json"),
+                         json.dumps(manifest, indent=2, ensure_ascii=False) + "\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
@@ -0,0 +1,127 @@
+"""Feed sinks: serialise rows as they are produced instead of collecting them.
+
+  with open_sink("llms-full.jsonl") as sink:       # .gz suffix -> gzip
+      for row in iter_chunks(pages):
+          sink.write(row)
+
+Each file sink writes to `<path>.tmp` and renames over `<path>` on a clean
+close, so readers (and --changed-since, which reads the previous feed while
+the new one is written) never see a partial file. With keep_unchanged, a
+close that would replace a file with identical bytes leaves it alone (mtime
+included) and sets `unchanged`. TeeSink fans one stream out to several sinks.
+Sinks count rows, uncompressed bytes and their sha256 as they go. Writers call
+begin_page(page_id, categories) before each page's rows; sinks that route by
+page (shards.CategoryShardSink) use it, the rest ignore it. write_line(data,
+tokens) takes the row's estimated_token_count alongside its bytes, so sinks that
+total tokens needn't parse the row back; write(row) passes it on.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+import profiling
+from artifact_writer import replace_if_changed
+
+
+def dumps(row):
+    """The one row serialisation every feed artifact uses."""
+    with profiling.stage("json", len(row.get("text", ""))):
+        return json.dumps(row, ensure_ascii=False) + "\n"
+
+
+class JsonlSink:
+    def __init__(self, path, keep_unchanged=False):
+        self.path = path
+        self.keep_unchanged = keep_unchanged
+        self.unchanged = False
+        self.rows = self.bytes = 0
+        self.sha256 = hashlib.sha256()
+        self._tmp = path + ".tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._f = self._open(self._tmp)
+
+    def _open(self, path):
+        return open(path, "wb")
+
+    def begin_page(self, page_id, categories):
+        pass
+
+    def write(self, row):
+        self.write_line(dumps(row).encode("utf-8"), row.get("estimated_token_count"))
+
+    def write_line(self, data, tokens=None):
+        """Append one already-serialised row (bytes, newline included)."""
+        self._f.write(data)
+        self.rows += 1
+        self.bytes += len(data)
+        self.sha256.update(data)
+
+    def close(self, commit=True):
+        if self._f is None:
+            return
+        self._f.close()
+        self._f = None
+        if commit and self.keep_unchanged:
+            self.unchanged = not replace_if_changed(self._tmp, self.path)
+        elif commit:
+            os.replace(self._tmp, self.path)
+        else:
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+
+class GzipJsonlSink(JsonlSink):
+    def _open(self, path):
+        # mtime=0 and no embedded filename: identical rows -> identical bytes.
+        self._raw = open(path, "wb")
+        return gzip.GzipFile(filename="", mode="wb", fileobj=self._raw, mtime=0)
+
+    def close(self, commit=True):
+        if self._f is not None:
+            self._f.close()
+            self._f = self._raw
+        super().close(commit)
+
+
+class TeeSink:
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+
+    @property
+    def rows(self):
+        return self.sinks[0].rows if self.sinks else 0
+
+    def begin_page(self, page_id, categories):
+        for s in self.sinks:
+            s.begin_page(page_id, categories)
+
+    def write(self, row):  # serialise once for every sink
+        self.write_line(dumps(row).encode("utf-8"), row.get("estimated_token_count"))
+
+    def write_line(self, data, tokens=None):
+        for s in self.sinks:
+            s.write_line(data, tokens)
+
+    def close(self, commit=True):
+        for s in self.sinks:
+            s.close(commit)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+
+def open_sink(*paths):
+    """A sink writing to every path (gzip for `.gz`); a TeeSink when several. Files
+    whose bytes don't change are left alone."""
+    sinks = [(GzipJsonlSink if p.endswith(".gz") else JsonlSink)(p, keep_unchanged=True)
+             for p in paths]
+    return sinks[0] if len(sinks) == 1 else TeeSink(*sinks)
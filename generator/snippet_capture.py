@@ -0,0 +1,104 @@
+"""Snippet expansions captured from the mkdocs build, reused by the feed pass.
+
+mkdocs renders every page through pymdownx.snippets, and hooks/ai_feed.py's
+on_post_build then resolves the same pages again for the feed. install() wraps
+SnippetPreprocessor.run so every expansion the build makes is recorded (text in
+-> text out, plus the include lookups generate_feed's dependency tracking would
+have seen), and generate_feed.resolve_snippets() serves a text the build
+already expanded, with the same preprocessor configuration, from the record.
+
+Only exact inputs are served, so a hit is byte-identical by construction. The
+one allowance is blank lines at either end: mkdocs strips those after the front
+matter and Jinja drops a trailing newline, and the preprocessor passes blank
+lines through unchanged in and out of blocks, so they are re-attached around a
+hit. The build expands a page after the macros plugin has rendered it and the
+feed before its own Jinja pass, so pages with template syntax in their body
+never match and are expanded again. bench_capture.py checks the parity.
+"""
+_CONFIG = ("base_path", "restrict_base_path", "encoding", "check_paths", "auto_append",
+           "url_download", "url_max_size", "url_timeout", "url_request_headers",
+           "dedent_subsections", "tab_length")
+
+
+def _config(pre):
+    """A preprocessor's output-relevant configuration, hashable."""
+    return tuple(repr(getattr(pre, name, None)) for name in _CONFIG)
+
+
+class SnippetCapture:
+    def __init__(self):
+        self._runs = {}  # (config, text in) -> (text out, lookups)
+        self.hits = self.misses = 0
+
+    def record(self, pre, text, out, lookups):
+        self._runs[(_config(pre), text)] = (out, list(lookups))
+
+    def get(self, pre, text):
+        """(expanded text, lookups) for `text` if the build expanded it with
+        `pre`'s configuration, else None."""
+        if not self._runs:
+            return None
+        config = _config(pre)
+        hit = self._runs.get((config, text))
+        if hit is None and "\r" not in text:
+            core = text.lstrip("\n")
+            lead, trail = text[:len(text) - len(core)], "\n" if core.endswith("\n") else ""
+            core = core[:len(core) - len(trail)]
+            if core != text:
+                hit = self._runs.get((config, core))
+                if hit is not None:
+                    hit = (lead + hit[0] + trail, hit[1])
+        if hit is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return hit[0], list(hit[1])
+
+    def clear(self):
+        self._runs.clear()
+        self.hits = self.misses = 0
+
+
+_CAPTURE = None
+_ORIGINAL_RUN = None
+_TRACK = None
+
+
+def shared():
+    """The process-wide SnippetCapture."""
+    global _CAPTURE
+    if _CAPTURE is None:
+        _CAPTURE = SnippetCapture()
+    return _CAPTURE
+
+
+def _run(self, lines):
+    if getattr(self, "_feed_pass", False):  # generate_feed's own: nothing to capture
+        return _ORIGINAL_RUN(self, lines)
+    text = "\n".join(lines)
+    if not hasattr(self, "deps"):
+        _TRACK(self)
+    self.deps = []
+    out = _ORIGINAL_RUN(self, lines)
+    shared().record(self, text, "\n".join(out), self.deps)
+    return out
+
+
+def own(pre):
+    """Mark `pre` as a feed-pass preprocessor, whose runs aren't recorded."""
+    pre._feed_pass = True
+
+
+def install(track):
+    """Record every SnippetPreprocessor run from now on; `track(pre)` must make
+    `pre.deps` collect its lookups (generate_feed._track_deps). Idempotent;
+    clears what earlier builds recorded. Returns shared()."""
+    global _ORIGINAL_RUN, _TRACK
+    from pymdownx import snippets
+
+    _TRACK = track
+    if _ORIGINAL_RUN is None:
+        _ORIGINAL_RUN = snippets.SnippetPreprocessor.run
+        snippets.SnippetPreprocessor.run = _run
+    shared().clear()
+    return shared()
@@ -0,0 +1,131 @@
+"""In-memory LRU cache of local snippet files, as pre-split lines, for pymdownx.snippets.
+
+pymdownx.snippets re-opens, decodes and re-splits a snippet file for every
+`--8<--` directive that names it, so a file included by ten pages with ten
+different `:start:end` ranges is read ten times per build (twice, counting the
+site build and the feed pass). This memoises the reads only: each file is read
+and split once per process until it changes, keyed by (path, mtime, size), and
+pymdownx still strips the lines and applies ranges and sections itself.
+
+pymdownx reads local files inline in SnippetPreprocessor.parse_snippets (there
+is no method to wrap, unlike download() for remote_snippets), through the
+module's `codecs.open`. install() swaps that `codecs` reference for a stand-in
+whose read-mode open() serves the cached lines, after checking parse_snippets
+still reads that way; if a pymdownx release changes it, install() warns and
+leaves pymdownx alone rather than silently not caching.
+
+Lines are split by the real codecs reader on a miss, so included text is
+byte-identical. The mkdocs build (hooks/ai_feed.py installs it in on_config)
+and generate_feed.py share the one cache when they run in the same process.
+
+  GEN_SNIPPET_FILE_CACHE=1024   max cached files (0 disables)
+"""
+import codecs
+import os
+import sys
+from collections import OrderedDict
+
+DEFAULT_ENTRIES = 1024
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class SnippetFileCache:
+    def __init__(self, max_entries=None):
+        self.max_entries = (_env_int("GEN_SNIPPET_FILE_CACHE", DEFAULT_ENTRIES)
+                            if max_entries is None else max_entries)
+        self._lines = OrderedDict()  # (abs path, encoding) -> ((mtime_ns, size), lines)
+        self.hits = self.misses = 0
+
+    def lines(self, path, encoding=None):
+        """The file's lines as iterating codecs.open(path, "r", encoding) yields them."""
+        key = (os.path.abspath(path), encoding)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = self._lines.get(key)
+        if entry is not None and entry[0] == stamp:
+            self._lines.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        with codecs.open(path, "r", encoding=encoding) as f:
+            lines = tuple(f)
+        self._lines[key] = (stamp, lines)
+        self._lines.move_to_end(key)
+        while len(self._lines) > self.max_entries:
+            self._lines.popitem(last=False)
+        return lines
+
+    def clear(self):
+        self._lines.clear()
+
+
+class _CachedFile:
+    def __init__(self, lines):
+        self._lines = lines
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _Codecs:
+    """Stands in for `codecs` inside pymdownx.snippets: read-mode open() is served
+    from the cache, everything else goes to the real module."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def open(self, filename, mode="r", encoding=None, *args, **kwargs):
+        if mode != "r" or args or kwargs:
+            return codecs.open(filename, mode, encoding, *args, **kwargs)
+        return _CachedFile(self.cache.lines(filename, encoding))
+
+    def __getattr__(self, name):
+        return getattr(codecs, name)
+
+
+_CACHE = None
+
+
+def shared():
+    """The process-wide SnippetFileCache."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = SnippetFileCache()
+    return _CACHE
+
+
+def _reads_via_codecs(snippets):
+    """Whether parse_snippets() still opens local files with the module's codecs.open."""
+    names = snippets.SnippetPreprocessor.parse_snippets.__code__.co_names
+    return (isinstance(getattr(snippets, "codecs", None), _Codecs)
+            or (getattr(snippets, "codecs", None) is codecs and "codecs" in names and "open" in names))
+
+
+def install():
+    """Serve pymdownx.snippets' local file reads from shared(). Idempotent.
+    Returns the cache, or None if GEN_SNIPPET_FILE_CACHE=0 or this pymdownx
+    doesn't read files the way the stand-in expects."""
+    from pymdownx import snippets
+
+    cache = shared()
+    if cache.max_entries <= 0:
+        return None
+    if not _reads_via_codecs(snippets):
+        print("[snippet_files] pymdownx.snippets no longer reads files via codecs.open; "
+              "snippet file cache disabled", file=sys.stderr)
+        return None
+    if not isinstance(snippets.codecs, _Codecs):
+        snippets.codecs = _Codecs(cache)
+    return cache
@@ -0,0 +1,180 @@
+"""Page -> snippet (and snippet -> snippet) dependency graph for the feed.
+
+generate_feed.build() writes it next to the feed (`<out>.deps.json`) from the
+include edges process_page() records, and `--changed-since <git-ref>` uses it to
+reprocess only pages whose own source or any transitively included snippet
+changed. Nodes are repo-relative paths (remote includes keep their URL).
+
+  {"fingerprint": "...", "feed_sha256": "...", "head": "<sha>", "uncommitted": [...],
+   "pages": {"docs/a.md": {"page_id": "a", "snippets": ["docs/.snippets/x.md"],
+                           "variables": {"dependencies.x.version": ["install"]},
+                           "tokens": [412, 380]}},
+   "snippets": {"docs/.snippets/x.md": ["docs/.snippets/y.md"]},
+   "variables": {"dependencies.x.version": "<value digest>"}}
+
+A page's `variables` are the variables.yml paths it (or an included snippet)
+reads, each with the anchors of the sections that read it — None when the read
+can't be placed in a section. The graph-level `variables` record each path's
+value digest at build time (var_usage.value_digest), so a variables.yml edit
+dirties only the pages reading a path whose value changed (variable_readers()).
+
+A page's `tokens` are its rows' estimated_token_count, in feed order, so rows
+copied from the previous feed reach the sinks with their counts (see sinks.py).
+
+A page whose resolution failed has `"snippets": null` and is always treated as
+affected. `head`/`uncommitted` record the tree the feed was built from, so a
+feed built from a dirty checkout, or at a commit other than the ref, still
+rebuilds correctly (see changed_paths()).
+"""
+import hashlib
+import json
+import os
+import subprocess
+
+import var_usage
+from artifact_writer import write_if_changed
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def repo_rel(path):
+    return os.path.relpath(os.path.abspath(path), REPO_ROOT).replace(os.sep, "/")
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class SnippetGraph:
+    def __init__(self, pages=None, snippets=None, fingerprint=None, feed_sha256=None,
+                 head=None, uncommitted=None, variables=None):
+        self.pages = pages or {}
+        self.snippets = snippets or {}
+        self.fingerprint = fingerprint
+        self.feed_sha256 = feed_sha256
+        self.head = head
+        self.uncommitted = uncommitted or []
+        self.variables = variables or {}
+
+    @classmethod
+    def load(cls, path):
+        """The graph at `path`, or None if it is missing or unreadable."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(d.get("pages"), d.get("snippets"), d.get("fingerprint"), d.get("feed_sha256"),
+                   d.get("head"), d.get("uncommitted"), d.get("variables"))
+
+    def save(self, path):
+        write_if_changed(path, json.dumps(
+            {"fingerprint": self.fingerprint, "feed_sha256": self.feed_sha256,
+             "head": self.head, "uncommitted": self.uncommitted,
+             "pages": self.pages, "snippets": self.snippets, "variables": self.variables},
+            indent=1, sort_keys=True) + "\n")
+
+    def add_page(self, page_path, page_id, edges, categories=None, variables=None, values=None,
+                 tokens=None):
+        """Record one page from process_page()'s `snippets` edge list (plus the
+        feed category ids it was sharded into, so reused pages keep them) and its
+        `variables` usage, with the `values` digests of those variables, and its
+        rows' token counts."""
+        page = repo_rel(page_path)
+        info = self.pages[page] = {"page_id": page_id, "categories": categories, "snippets": None,
+                                   "variables": variables or {}, "tokens": tokens}
+        self.variables.update(values or {})
+        if edges is None:
+            return
+        info["snippets"] = sorted({c for p, c in edges if p is None})
+        for parent, child in edges:
+            if parent is not None:
+                kids = self.snippets.setdefault(parent, [])
+                if child not in kids:
+                    kids.append(child)
+                    kids.sort()
+
+    def dependents(self):
+        """Reverse edges: node -> pages/snippets that include it directly."""
+        rev = {}
+        for page, info in self.pages.items():
+            for s in info["snippets"] or ():
+                rev.setdefault(s, set()).add(page)
+        for parent, kids in self.snippets.items():
+            for s in kids:
+                rev.setdefault(s, set()).add(parent)
+        return rev
+
+    def affected(self, changed, remote_volatile=False):
+        """Pages (repo-relative) touched by `changed` repo-relative paths, directly or
+        through any chain of includes. With remote_volatile, URL includes count as
+        changed (they can't be diffed with git)."""
+        rev = self.dependents()
+        todo = list(changed)
+        if remote_volatile:
+            todo.extend(n for n in rev if n.lower().startswith(("http://", "https://")))
+        seen = set(todo)
+        while todo:
+            for parent in rev.get(todo.pop(), ()):
+                if parent not in seen:
+                    seen.add(parent)
+                    todo.append(parent)
+        return {p for p, info in self.pages.items() if p in seen or info["snippets"] is None}
+
+    def changed_variables(self, variables):
+        """Recorded variable paths whose value in `variables` differs from the build's."""
+        return {p for p, d in self.variables.items() if var_usage.value_digest(variables, p) != d}
+
+    def variable_readers(self, changed):
+        """{page: anchors of the sections reading any of `changed` (None: all of
+        them)} for the pages that read a changed variable path."""
+        readers = {}
+        for page, info in self.pages.items():
+            for path, anchors in (info.get("variables") or {}).items():
+                if path not in changed:
+                    continue
+                if anchors is None or readers.get(page, ()) is None:
+                    readers[page] = None
+                else:
+                    readers[page] = sorted(set(readers.get(page, ())) | set(anchors))
+        return readers
+
+
+def _git(*argv):
+    return subprocess.run(["git", *argv], capture_output=True, text=True,
+                          cwd=REPO_ROOT, check=True).stdout.splitlines()
+
+
+def git_state():
+    """(HEAD sha, sorted paths differing from HEAD incl. untracked), or (None, [])
+    outside a git checkout."""
+    try:
+        head = _git("rev-parse", "HEAD")[0]
+        return head, sorted(set(git_diff_names("HEAD")))
+    except (OSError, IndexError, subprocess.CalledProcessError):
+        return None, []
+
+
+def git_diff_names(ref):
+    """Repo-relative paths that differ between `ref` and the working tree,
+    including uncommitted and untracked files. Renames count as delete + add."""
+    changed = _git("diff", "--name-only", "--no-renames", ref, "--")
+    changed += _git("ls-files", "--others", "--exclude-standard")
+    return {c for c in changed if c}
+
+
+def changed_paths(graph, ref):
+    """Paths to treat as changed when updating the feed `graph` describes: the diff
+    against `ref`, plus whatever the previous build had uncommitted, plus the diff
+    against the commit it was built at if that isn't `ref`. Exits on a bad ref."""
+    try:
+        changed = git_diff_names(ref)
+        if graph.head and graph.head != _git("rev-parse", ref + "^{commit}")[0]:
+            changed |= git_diff_names(graph.head)
+    except (OSError, IndexError, subprocess.CalledProcessError) as e:
+        raise SystemExit(f"--changed-since {ref}: git failed: {getattr(e, 'stderr', e)}")
+    return changed | set(graph.uncommitted)
@@ -0,0 +1,129 @@
+"""Which variables.yml paths a page (or snippet) uses, and compiled-template reuse.
+
+Pages are Jinja templates rendered against docs/variables.yml, but most have no
+template syntax at all. compile_template() parses a text once per distinct
+content (LRU by sha256) and returns the compiled template together with the
+dotted variable paths it reads, e.g. `dependencies.repositories.polkadot_sdk.version`,
+each with the template lines that read it. A subscript that isn't a constant
+(`deps[name].version`) makes the template depend on the whole container.
+
+value_digest() fingerprints the value at a path, so "did this page's inputs
+change" is a comparison of a few digests instead of a hash of the whole file:
+the page cache and --changed-since use it to re-render only the pages whose
+variables changed, and `generate_feed.py --vars-affected` lists them.
+"""
+import hashlib
+import json
+import re
+from collections import OrderedDict
+
+from jinja2 import nodes
+
+TEMPLATE_CACHE_SIZE = 256
+_MISSING = object()
+_TEMPLATES = OrderedDict()  # (id(env), sha256(text)) -> (template, usage)
+_NEWLINE_RE = re.compile(r"\r\n|\r|\n")  # jinja2.lexer.newline_re
+
+
+def has_syntax(text):
+    return "{{" in text or "{%" in text or "{#" in text
+
+
+def render_plain(text):
+    """What Jinja renders for a text without template syntax: line endings
+    normalised to "\\n" and one trailing newline dropped."""
+    lines = _NEWLINE_RE.split(text)
+    if lines[-1] == "":
+        del lines[-1]
+    return "\n".join(lines)
+
+
+def _chain(node, usage, bound):
+    """Record the dotted path a Getattr/Getitem/Name chain reads; walk any
+    non-constant subscripts for paths of their own."""
+    parts, lineno = [], node.lineno
+    while True:
+        if isinstance(node, nodes.Getattr):
+            parts.append(node.attr)
+        elif isinstance(node, nodes.Getitem):
+            arg = node.arg
+            if isinstance(arg, nodes.Const) and isinstance(arg.value, (str, int)):
+                parts.append(str(arg.value))
+            else:
+                parts = []  # dynamic subscript: depend on the container
+                _walk(arg, usage, bound)
+        elif isinstance(node, nodes.Name):
+            if node.ctx == "load" and node.name not in bound:
+                parts.append(node.name)
+                usage.setdefault(".".join(reversed(parts)), set()).add(lineno)
+            return
+        else:
+            _walk(node, usage, bound)
+            return
+        node = node.node
+
+
+def _walk(node, usage, bound):
+    if isinstance(node, (nodes.Getattr, nodes.Getitem, nodes.Name)):
+        _chain(node, usage, bound)
+        return
+    if isinstance(node, nodes.Call) and isinstance(node.node, nodes.Getattr):
+        # x.items(), x.get("k"): the method name isn't a path segment; the call
+        # reads its receiver, so depend on the container.
+        _walk(node.node.node, usage, bound)
+        for child in (*node.args, *node.kwargs, node.dyn_args, node.dyn_kwargs):
+            if child is not None:
+                _walk(child, usage, bound)
+        return
+    for child in node.iter_child_nodes():
+        _walk(child, usage, bound)
+
+
+def template_usage(ast):
+    """{dotted path: sorted line numbers} a parsed template reads."""
+    bound = {n.name for n in ast.find_all(nodes.Name) if n.ctx in ("store", "param")}
+    usage = {}
+    _walk(ast, usage, bound)
+    return {path: sorted(lines) for path, lines in usage.items()}
+
+
+def compile_template(env, text):
+    """(template, usage) for `text`, parsed and compiled once per distinct content.
+    Raises jinja2's TemplateSyntaxError like env.from_string()."""
+    key = (id(env), hashlib.sha256(text.encode("utf-8")).digest())
+    hit = _TEMPLATES.get(key)
+    if hit is not None:
+        _TEMPLATES.move_to_end(key)
+        return hit
+    ast = env.parse(text)
+    usage = template_usage(ast)
+    template = env.template_class.from_code(env, env.compile(ast), env.make_globals(None), None)
+    _TEMPLATES[key] = hit = (template, usage)
+    if len(_TEMPLATES) > TEMPLATE_CACHE_SIZE:
+        _TEMPLATES.popitem(last=False)
+    return hit
+
+
+def lookup(variables, path):
+    value = variables
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+
+def value_digest(variables, path):
+    value = lookup(variables, path)
+    if value is _MISSING:
+        return "missing"
+    blob = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def changed_paths(paths, old, new):
+    """The subset of `paths` whose value differs between two variables dicts."""
+    return {p for p in paths if value_digest(old, p) != value_digest(new, p)}
@@ -1,17 +1,37 @@
 """Build-time AI artifacts — in-house replacement for the papermoon `ai_docs` plugin.
 
 Produces, during `mkdocs build`:
-  1. site/ai/llms-full.jsonl   — the chunked corpus feed (with `source` + `url`).
-  2. site/<route>.md           — one resolved-markdown artifact per page.
-  3. Page-action dropdowns     — injected into `.page-header-row`.
+  1. site/ai/llms-full.jsonl   — the chunked corpus feed (with `source` + `url`),
+     its byte-offset index (llms-full.index.json, read with generator/feed_index.py),
+     a BM25 inverted index (llms-full.bm25, read with generator/bm25.py),
+     with GEN_FEED_DEDUP=report|refs a near-duplicate report (llms-dedup.json),
+     per-category shards + manifest.json under site/ai/shards/, and — when
+     GEN_FEED_PREVIOUS names the last deploy's feed or index — site/ai/llms-delta.jsonl.
+  2. site/<route>.md           — one resolved-markdown artifact per page (written on a
+     thread pool).
+  3. Page-action dropdowns     — rendered in `.page-header-row` by the theme's
+     page-badges.html slot (page.meta.ai_actions), or injected into it as a fallback.
   4. site/llms.txt             — llms.txt index.
   5. The ai-resources.md page  — fills in its body (via on_page_markdown).
 
 All chunking/metadata logic lives in generator/generate_feed.py (single source of
 truth via process_page/chunk_row); this hook only handles mkdocs integration.
-It honors mkdocs `exclude_docs` by working off the build's own file list.
+It honors mkdocs `exclude_docs` by working off the build's own file list, and
+reuses what the build already did: each page's source is read once, and snippet
+expansions made by the page renders are served to the feed pass
+(generator/snippet_capture.py). Under `mkdocs serve` each page's result and
+serialised rows stay in memory, and a rebuild reprocesses only pages whose
+source, snippet files or read variables changed.
+mkdocs empties site_dir before a build, so the artifacts above are written to a
+persistent stage, <repo>/.cache/ai_site/<command> (GEN_ARTIFACT_STAGE; "" writes
+straight into site_dir), only when their bytes changed, then hardlinked into
+the site (artifact_writer.publish): an unchanged artifact keeps its mtime
+across builds, so rsync/CDN diffs stay small.
+GEN_FEED_PROFILE=<path> writes a per-stage, per-page timing report of the feed
+pass there (generator/profiling.py; GEN_FEED_PROFILE_MEMORY=1 adds tracemalloc).
 """
 import html
+import io
 import json
 import logging
 import os
@@ -25,12 +45,31 @@ sys.path.insert(0, os.path.join(_ROOT, "generator"))
 import yaml  # noqa: E402
 from jinja2 import Environment  # noqa: E402
 
-from generate_feed import estimate_tokens, process_page  # noqa: E402
+import feed_delta  # noqa: E402
+import feed_index  # noqa: E402
+import git_dates  # noqa: E402
+import page_cache  # noqa: E402
+import profiling  # noqa: E402
+import remote_snippets  # noqa: E402
+import snippet_capture  # noqa: E402
+import snippet_files  # noqa: E402
+import var_usage  # noqa: E402
+from artifact_writer import ArtifactWriter, publish  # noqa: E402
+from bm25 import BM25Sink  # noqa: E402
+from dedup import DedupSink  # noqa: E402
+from generate_feed import capture_build_snippets, process_page  # noqa: E402
+from shards import CategoryShardSink, category_ids  # noqa: E402
+from sinks import JsonlSink, TeeSink, dumps  # noqa: E402
 
 log = logging.getLogger("mkdocs")
 SOURCE_TAG = "polkadot-docs"
 _CFG = None
+_COMMAND = "build"
 _INCLUDED = None  # {src_uri: abs_path} for pages mkdocs actually builds (post exclude_docs)
+_SOURCES = {}  # {abs_path: bytes} as read for the site render, reused by the feed pass
+# Feed-pass results kept across `mkdocs serve` rebuilds (mkdocs loads a hook module
+# once per process): {abs_path: {"raw", "setup", "deps", "page", "lines"}}.
+_RESIDENT = {}
 
 
 def _load_cfg(config):
@@ -44,10 +83,13 @@ def _load_cfg(config):
         "docs_base_url": llms.get("project", {}).get("docs_base_url", config["site_url"]).rstrip("/"),
         "skip_basenames": set(excl.get("skip_basenames", [])),
         "skip_paths": excl.get("skip_paths", []),
+        "categories_info": llms.get("content", {}).get("categories_info", {}),
         "variables": yaml.safe_load(open(os.path.join(config["docs_dir"], "variables.yml"), encoding="utf-8")) or {},
         "env": Environment(),
         "snippets": os.path.join(config["docs_dir"], ".snippets"),
         "site_path": urlparse(config["site_url"] or "/").path.rstrip("/"),
+        # Shared with generator/generate_feed.py — a CI feed run warms the build's cache.
+        "cache": page_cache.PageCache() if page_cache.enabled() else None,
     }
     return _CFG
 
@@ -64,14 +106,63 @@ def _feed_excluded(src_uri, cfg, meta=None):
     return False
 
 
+def on_startup(command, dirty, **kwargs):
+    global _COMMAND
+    _COMMAND = command
+
+
+def on_config(config, **kwargs):
+    global _CFG
+    _CFG = None  # every (serve) rebuild re-reads llms_config.json and variables.yml
+    # Serve the site build's own remote `--8<--` includes from the on-disk cache the
+    # generator uses too. TTLs are 0 here: every remote is revalidated once per build
+    # (ETag / If-Modified-Since), so nothing stale is published and a fixed URL
+    # passes at once. A dead or unreachable, uncached include fails the build, as
+    # pymdownx's own download does (GEN_SNIPPET_ALLOW_MISSING=1 drops it with a
+    # warning, for offline previews).
+    remote_snippets.install(on_missing=lambda url, e: log.warning(
+        "[ai_feed] remote snippet %s: %s",
+        "unavailable" if remote_snippets.shared().strict else "dropped", e),
+        strict=True, ttl=0, dead_ttl=0)
+    # Local includes too: each snippet file is read and split once per process
+    # (until it changes), for the site build and the feed pass alike.
+    snippet_files.install()
+    # ...and the feed pass reuses the expansions the page renders make, rather
+    # than resolving every page's includes a second time.
+    capture_build_snippets()
+    # last_updated dates come from the persisted index (a file load once warm); a
+    # shallow CI clone would publish the clone depth as every page's date.
+    shallow = git_dates.shallow_report(git_dates.load())
+    if shallow:
+        log.warning("[ai_feed] %s", shallow)
+    return config
+
+
 def on_files(files, config, **kwargs):
     # Authoritative page set AFTER mkdocs applies exclude_docs — so README.md,
     # AGENTS.md, etc. never get an artifact, feed entry, or 404'd llms.txt link.
     global _INCLUDED
     _INCLUDED = {f.src_uri: f.abs_src_path for f in files.documentation_pages()}
+    _SOURCES.clear()
     return files
 
 
+def on_page_read_source(page, config, **kwargs):
+    # Read each page once: mkdocs renders the text (decoded exactly as
+    # File.content_string would), the feed pass processes the same bytes.
+    path = page.file.abs_src_path
+    if not path or page.file.src_uri not in (_INCLUDED or {}):
+        return None
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        text = io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8-sig", errors="strict").read()
+    except (OSError, ValueError):
+        return None  # let mkdocs read it and report the error
+    _SOURCES[path] = raw
+    return text
+
+
 # --------------------------------------------------------------- ai-resources page
 
 AI_RESOURCES_MD = """
@@ -81,8 +172,19 @@ Machine-readable versions of this documentation, for LLMs and AI tools.
 
 - [`/ai/llms-full.jsonl`](/ai/llms-full.jsonl): every documentation page, pre-chunked
   by section. One JSON object per line with `source`, `page_id`, `url`, heading
-  `anchor`, `page_version_hash`, and the section `text`. Regenerated on every docs
-  deploy — it is a snapshot of the current docs, not a log.
+  `anchor`, `page_version_hash`, and the section `text`. `chunk_hash` (of the
+  section's text) and `heading_path_hash` (of its page and enclosing headings) change
+  only when that section does, so caches can be keyed per chunk. Regenerated on
+  every docs deploy — it is a snapshot of the current docs, not a log.
+- [`/ai/llms-full.index.json`](/ai/llms-full.index.json): byte offset and length of
+  every page's rows (by `page_id`) and every chunk (by `url`) in the feed, so a
+  client can fetch just those bytes with an HTTP `Range` request.
+- [`/ai/llms-full.bm25`](/ai/llms-full.bm25): a precomputed BM25 keyword index of
+  the feed's chunks (term postings with frequencies, chunk lengths, and IDF), in
+  the binary layout documented in the docs repo's `generator/bm25.py`.
+- [`/ai/shards/manifest.json`](/ai/shards/manifest.json): the same feed split by
+  category (`/ai/shards/<category>.jsonl`), with each shard's chunk count, token
+  total, size, and sha256 — fetch only the slices you need.
 - [`/llms.txt`](/llms.txt): index file following the [llms.txt convention](https://llmstxt.org/).
 
 ## Per-page Markdown
@@ -139,13 +241,14 @@ def _dropdown_html(md_href, page_url_abs, filename):
 </div>"""
 
 
-# A <div> carrying `page-header-row` as a whole class token (not a substring like
+# Fallback for templates without the page-badges.html slot: a <div> carrying
+# `page-header-row` as a whole class token (not a substring like
 # page-header-row-wrapper, and only inside class="…", never a data-* value). Tolerant
-# of a second class / data-variant / attribute order. (Template-level injection in
-# page-badges.html would be even cleaner; this keeps the theme untouched.)
+# of a second class / data-variant / attribute order.
 _ROW_RE = re.compile(
     r'<div\b[^>]*\bclass\s*=\s*"[^"]*(?<![\w-])page-header-row(?![\w-])[^"]*"[^>]*>', re.I)
 _DIV_TAG_RE = re.compile(r'<div\b|</div>', re.I)
+_WIDGET_CLASS = "ai-file-actions-container"
 
 
 def _inject_dropdown(output, widget):
@@ -170,73 +273,167 @@ def _inject_dropdown(output, widget):
     return "".join(parts)
 
 
-def on_post_page(output, page, config, **kwargs):
-    cfg = _load_cfg(config)
-    if _feed_excluded(page.file.src_uri, cfg, page.meta):  # hidden pages get no dropdown
-        return output
+def _page_widget(page, cfg):
+    """The dropdown HTML for `page`, or None (hidden pages and the homepage get none)."""
+    if _feed_excluded(page.file.src_uri, cfg, page.meta):
+        return None
     route = page.url.rstrip("/")
     if not route:
-        return output
+        return None
     md_href = f'{cfg["site_path"]}/{route}.md'
     page_abs = f'{cfg["docs_base_url"]}/{route}/'
-    widget = _dropdown_html(md_href, page_abs, os.path.basename(md_href))
+    return _dropdown_html(md_href, page_abs, os.path.basename(md_href))
+
+
+def on_page_context(context, page, config, **kwargs):
+    # The theme renders the dropdown through render_badges(..., actions) in
+    # partials/page-badges.html, so no rendered HTML has to be scanned for it.
+    widget = _page_widget(page, _load_cfg(config))
+    if widget:
+        page.meta["ai_actions"] = widget
+    return context
+
+
+def on_post_page(output, page, config, **kwargs):
+    widget = page.meta.get("ai_actions")
+    if not widget or _WIDGET_CLASS in output:  # rendered by the template slot
+        return output
     return _inject_dropdown(output, widget)
 
 
 # --------------------------------------------------------------- artifacts on build
 
-def _write_md(site_dir, route, page):
+def _write_md(out, site_dir, route, page):
     header = {
         "title": page["title"],
         "description": page["fm"].get("description"),
         "categories": page["fm"].get("categories"),
         "url": page["url"],
-        "word_count": len(re.findall(r"\b\w+\b", page["body"], re.UNICODE)),
-        "token_estimate": estimate_tokens(page["body"]),
+        "word_count": page["word_count"],
+        "token_estimate": page["token_estimate"],
         "version_hash": page["version_hash"],
         "last_updated": page["last_updated"],
     }
-    out_md = os.path.join(site_dir, *route.split("/")) + ".md"
-    os.makedirs(os.path.dirname(out_md), exist_ok=True)
-    with open(out_md, "w", encoding="utf-8") as f:
-        f.write("---\n")
-        for k, v in header.items():
-            if v not in (None, "", []):
-                f.write(f"{k}: {json.dumps(v, ensure_ascii=False) if isinstance(v, list) else v}\n")
-        f.write("---\n\n")
-        f.write(page["body"].strip() + "\n")
+    lines = ["---\n"]
+    for k, v in header.items():
+        if v not in (None, "", []):
+            lines.append(f"{k}: {json.dumps(v, ensure_ascii=False) if isinstance(v, list) else v}\n")
+    lines.append("---\n\n")
+    lines.append(page["body"].strip() + "\n")
+    out.write(os.path.join(site_dir, *route.split("/")) + ".md", "".join(lines))
+
+
+def _feed_page(abs_path, docs_dir, cfg):
+    """(process_page() result, its serialised rows, reprocessed?). A page whose
+    bytes, snippet files and read variable values are unchanged since the last
+    build in this process (a `mkdocs serve` rebuild) is served from _RESIDENT."""
+    raw = _SOURCES.pop(abs_path, None)
+    if raw is None:
+        with open(abs_path, "rb") as f:
+            raw = f.read()
+    setup = (docs_dir, cfg["snippets"], cfg["docs_base_url"])
+    r = _RESIDENT.get(abs_path)
+    if (r is not None and r["raw"] == raw and r["setup"] == setup and r["deps"] is not None
+            and all(page_cache.dep_hash(d) == h for d, h in r["deps"].items())
+            and all(var_usage.value_digest(cfg["variables"], p) == d
+                    for p, d in r["page"]["variable_values"].items())):
+        return r["page"], r["lines"], False
+    page = process_page(abs_path, docs_dir, cfg["variables"], cfg["env"], cfg["snippets"],
+                        cfg["docs_base_url"], SOURCE_TAG, cache=cfg["cache"], raw_bytes=raw)
+    edges = page["snippets"]  # None: resolution failed, so always redo it
+    deps = None if edges is None else {c: page_cache.dep_hash(c) for _, c in edges}
+    lines = [dumps(row).encode("utf-8") for row in page["chunks"]]
+    _RESIDENT[abs_path] = {"raw": raw, "setup": setup, "deps": deps, "page": page, "lines": lines}
+    return page, lines, True
 
 
 def on_post_build(config, **kwargs):
     cfg = _load_cfg(config)
     docs_dir = os.path.abspath(config["docs_dir"])
     site_dir = config["site_dir"]
+    # serve rewrites site_url, so its artifacts differ from a build's: one stage each.
+    stage = os.environ.get("GEN_ARTIFACT_STAGE", os.path.join(_ROOT, ".cache", "ai_site"))
+    stage = os.path.join(stage, _COMMAND) if stage else site_dir
     included = _INCLUDED or {}
-    rows, pages = [], []
-
-    for src_uri, abs_path in sorted(included.items()):
-        if src_uri == "index.md":
-            continue  # homepage: no .md artifact / feed entry (matches the generator)
-        page = process_page(abs_path, docs_dir, cfg["variables"], cfg["env"],
-                            cfg["snippets"], cfg["docs_base_url"], SOURCE_TAG)
-        _write_md(site_dir, page["route"], page)
-        if not _feed_excluded(src_uri, cfg, page["fm"]):
-            pages.append((page["title"], page["url"]))
-            rows.extend(page["chunks"])
-
-    ai_dir = os.path.join(site_dir, "ai")
-    os.makedirs(ai_dir, exist_ok=True)
-    with open(os.path.join(ai_dir, "llms-full.jsonl"), "w", encoding="utf-8") as f:
-        for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
-
-    with open(os.path.join(site_dir, "llms.txt"), "w", encoding="utf-8") as f:
-        f.write("# Polkadot Developer Docs\n\n")
-        f.write("> Developer documentation for Polkadot. Full pre-chunked corpus: "
-                f'{cfg["docs_base_url"]}/ai/llms-full.jsonl — per-page resolved Markdown: '
-                "append .md to any page URL.\n\n## Pages\n\n")
-        for title, url in pages:
-            f.write(f"- [{title}]({url})\n")
-
-    log.info("[ai_feed] wrote %d chunks across %d pages -> ai/llms-full.jsonl, "
-             "per-page .md, llms.txt", len(rows), len(pages))
+    pages = []
+    previous = os.environ.get("GEN_FEED_PREVIOUS")
+    previous = feed_index.load(previous) if previous else None
+    profile_out = os.environ.get("GEN_FEED_PROFILE")
+    if profile_out:
+        profiling.start(memory=os.environ.get("GEN_FEED_PROFILE_MEMORY", "0") != "0")
+
+    # Rows stream to the feed (and its category shards) as each page is processed;
+    # only (title, url) pairs for llms.txt are kept across the whole site.
+    # Artifacts go to the stage, on a pool and only when their bytes change.
+    out = ArtifactWriter()
+    feed = JsonlSink(os.path.join(stage, "ai", "llms-full.jsonl"), keep_unchanged=True)
+    shard_sink = CategoryShardSink(os.path.join(stage, "ai", "shards"), cfg["categories_info"], feed)
+    index = feed_index.IndexSink(os.path.join(stage, "ai", "llms-full.index.json"), feed)
+    search = BM25Sink(os.path.join(stage, "ai", "llms-full.bm25"))
+    staged = [feed.path, index.path, search.path, os.path.join(shard_sink.out_dir, "manifest.json")]
+    sink = TeeSink(feed, index, search, shard_sink)
+    dedup_mode = os.environ.get("GEN_FEED_DEDUP", "")
+    if dedup_mode:
+        sink = DedupSink(sink, os.path.join(stage, "ai", "llms-dedup.json"),
+                         refs=dedup_mode == "refs")
+        staged.append(sink.report_path)
+    processed = set()
+    with sink:
+        for src_uri, abs_path in sorted(included.items()):
+            if src_uri == "index.md":
+                continue  # homepage: no .md artifact / feed entry (matches the generator)
+            with profiling.page(os.path.relpath(abs_path, _ROOT).replace(os.sep, "/")):
+                page, lines, redone = _feed_page(abs_path, docs_dir, cfg)
+                if redone:
+                    processed.add(abs_path)
+                with profiling.stage("emit"):
+                    _write_md(out, stage, page["route"], page)
+                    if not _feed_excluded(src_uri, cfg, page["fm"]):
+                        pages.append((page["title"], page["url"]))
+                        sink.begin_page(page["page_id"], category_ids(page["fm"].get("categories"),
+                                                                      cfg["categories_info"]))
+                        for line, row in zip(lines, page["chunks"]):
+                            sink.write_line(line, row["estimated_token_count"])
+        rows = sink.rows
+    for abs_path in set(_RESIDENT) - set(included.values()):  # deleted or now excluded
+        del _RESIDENT[abs_path]
+
+    out.write(os.path.join(stage, "llms.txt"), "".join(
+        ["# Polkadot Developer Docs\n\n",
+         "> Developer documentation for Polkadot. Full pre-chunked corpus: "
+         f'{cfg["docs_base_url"]}/ai/llms-full.jsonl — per-page resolved Markdown: '
+         "append .md to any page URL.\n\n## Pages\n\n"]
+        + [f"- [{title}]({url})\n" for title, url in pages]))
+    out.close()
+
+    if previous is not None:
+        staged.append(os.path.join(stage, "ai", "llms-delta.jsonl"))
+        d = feed_delta.write_delta(staged[-1], previous,
+                                   index.index("llms-full.jsonl", feed.sha256.hexdigest()), feed.path)
+        log.info("[ai_feed] llms-delta.jsonl: %d added, %d changed, %d metadata-only, %d removed",
+                 d["added"], d["changed"], d["meta"], d["removed"])
+    if stage != site_dir:
+        staged += out.paths + [s.path for s in shard_sink.shards.values()]
+        publish(stage, site_dir, staged)
+
+    if len(processed) < len(_RESIDENT):
+        log.info("[ai_feed] reprocessed %d of %d pages; the rest were unchanged since the "
+                 "last build", len(processed), len(_RESIDENT))
+    log.info("[ai_feed] wrote %d chunks across %d pages -> ai/llms-full.jsonl%s "
+             "(+%d category shards), per-page .md, llms.txt (%d written, %d unchanged since the "
+             "last build)",
+             rows, len(pages), " (unchanged)" if feed.unchanged else "", len(shard_sink.shards),
+             out.written, out.skipped)
+    if cfg["cache"] is not None:
+        cache = cfg["cache"]
+        log.debug("[ai_feed] page cache: %d hits, %d misses, %d evicted",
+                  cache.hits, cache.misses, cache.prune())
+    files = snippet_files.shared()
+    log.debug("[ai_feed] snippet file cache: %d hits, %d misses", files.hits, files.misses)
+    captured = snippet_capture.shared()
+    log.debug("[ai_feed] snippet expansions reused from the site render: %d, redone: %d",
+              captured.hits, captured.misses)
+    if profile_out:
+        p = profiling.stop().write(profile_out)
+        log.info("[ai_feed] profile -> %s: %.2fs wall, slowest stage %s", profile_out,
+                 p["wall_seconds"], next(iter(p["stages"]), "-"))
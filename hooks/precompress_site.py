@@ -0,0 +1,44 @@
+"""MkDocs hook: precompressed .gz/.br siblings of the built site's text files.
+
+Runs generator/precompress.py over site_dir in on_post_build, so a static host
+can serve them gzip_static-style with no per-request compression. Anything that
+writes site files after it would leave their siblings stale, so on_post_build is
+registered at event priority -100 ("last" in mkdocs' scale): it runs after every
+plugin and hook at a higher priority, including the default 0 and plugins that
+ask to run late. A handler also at -100 runs before it if it was registered
+first (plugins, then hooks in mkdocs.yml order, where this one is listed last).
+
+Skipped under `mkdocs serve`, whose dev server never sends the siblings.
+GEN_PRECOMPRESS=0 skips it for builds too (see precompress.py for the rest).
+"""
+import logging
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, "generator"))
+
+from mkdocs.plugins import event_priority  # noqa: E402
+
+import precompress  # noqa: E402
+
+log = logging.getLogger("mkdocs")
+
+_SERVING = False
+
+
+def on_startup(command, dirty, **kwargs):
+    global _SERVING
+    _SERVING = command == "serve"
+
+
+@event_priority(-100)
+def on_post_build(config, **kwargs):
+    if _SERVING or not precompress.enabled():
+        return
+    pre = precompress.Precompressor()
+    s = pre.compress_site(config["site_dir"])
+    log.info("[precompress] %d files (%s): %d compressed, %d reused from cache, "
+             "%d siblings written", s["files"], "+".join(sfx for sfx, _ in pre.encodings),
+             s["compressed"], s["reused"], s["written"])
+    pre.prune()